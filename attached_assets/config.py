@@ -10,6 +10,7 @@ from pathlib import Path
 CONFIG_DIR = Path.home() / ".php_translator"
 CONFIG_FILE = CONFIG_DIR / "config.json"
 CACHE_FILE = CONFIG_DIR / "translations_cache.json"
+PERSISTENT_CACHE_FILE = CONFIG_DIR / "translations_cache.db"
 PROJECTS_DIR = CONFIG_DIR / "projects"
 
 # إنشاء مجلد الإعدادات إذا لم يكن موجوداً
@@ -152,6 +153,38 @@ TRANSLATION_PROMPT = """أنت مترجم خبير متخصص في ترجمة و
 
 ترجم النص التالي فقط دون إضافات:"""
 
+# بروميت الترجمة الدفعية: ثابت حرفياً بين كل الطلبات ويُرسل أولاً كرسالة system
+# حتى تستفيد المزودات من التخزين المؤقت التلقائي للبادئة (أكثر من 1024 توكن)
+BATCH_TRANSLATION_PROMPT = """أنت مترجم خبير متخصص في ترجمة واجهات أنظمة التوصيل والطعام (مثل طلبات، هنجرستيشن، أوبر إيتس) من الإنجليزية إلى العربية.
+
+ستصلك رسالة تحتوي مصفوفة JSON من النصوص. ترجم كل نص إلى العربية وأعد مصفوفة JSON فقط
+تحتوي الترجمات بنفس العدد والترتيب، بدون أي شرح أو تعليق أو تنسيق Markdown.
+
+قواعد الترجمة المهمة:
+1. حافظ على:
+   - المتغيرات البرمجية مثل $name, {{variable}}, :attribute, %s
+   - الأرقام والرموز الخاصة
+   - تنسيق HTML إذا وجد
+   - علامات الترقيم في نهاية النص
+
+2. فهم النص رغم الفواصل والشرطات:
+   - "ex_:_new_attribute" = "مثال: خاصية جديدة"
+   - "search_sub_category" = "البحث في الفئة الفرعية"
+
+3. ترجم بطريقة طبيعية مناسبة للمستخدم العربي
+4. اجعل الترجمة مختصرة ومفهومة
+5. لا تدمج النصوص ولا تقسمها: كل عنصر في المصفوفة يقابله عنصر واحد في الناتج
+
+استخدم هذه المصطلحات بالضبط:
+""" + "\n".join(f'   - {english} = "{arabic}"' for english, arabic in DELIVERY_TERMINOLOGY.items()) + """
+
+أمثلة:
+المدخل: ["Order placed successfully", "Delivery man assigned", "Your cart is empty"]
+الناتج: ["تم تقديم الطلب بنجاح", "تم تعيين مندوب التوصيل", "سلة التسوق فارغة"]
+
+المدخل: ["Welcome back, :name", "Total: %s", "<b>Cash on delivery</b>"]
+الناتج: ["مرحباً بعودتك، :name", "المجموع: %s", "<b>الدفع عند الاستلام</b>"]"""
+
 class Config:
     """كلاس إدارة الإعدادات"""
     
@@ -163,6 +196,7 @@ class Config:
             'auto_save_interval': 5,  # بالدقائق
             'backup_files': True,
             'batch_size': 10,
+            'parallel_workers': 4,  # عدد الدفعات المرسلة بالتوازي
             'max_retries': 3,
             'timeout': 30,
             'connection_timeout': 180,  # 3 دقائق للحفظ التلقائي عند انقطاع الاتصال
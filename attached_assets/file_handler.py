@@ -2,21 +2,346 @@
 """
 معالج ملفات PHP لاستخراج وحفظ الترجمات مع تحسينات
 """
+import os
 import re
+import sys
+import codecs
 import shutil
 import json
+from array import array
+from collections import defaultdict
+from itertools import chain
+from operator import and_
 from pathlib import Path
 from utils import create_backup_filename, sanitize_filename, has_arabic_content, determine_translation_status
 
+# حجم المحتوى (بالأحرف) الذي يبدأ عنده المسح المتوازي على عدة عمليات
+PARALLEL_SCAN_THRESHOLD = 1_000_000
+
+# عدد العناصر الذي يبدأ عنده فحص الترجمات والبحث عن المكرر على عدة عمليات
+PARALLEL_ITEMS_THRESHOLD = 200_000
+
+# أنماط مُجمّعة مسبقاً لتجنب إعادة التجميع في الحلقات
+# نمط موحّد لأنواع الاقتباس الأربعة: (مفتاح مفرد | مفتاح مزدوج) => (قيمة مفردة | قيمة مزدوجة)
+# تُطبق الأنماط على المحتوى كاملاً، لذلك لا تسمح بتجاوز نهاية السطر.
+# محتوى السلسلة إما حرف عادي أو تسلسل هروب (\' أو \" ...)، والبديلان لا يبدآن بنفس الحرف
+# فلا يوجد تراجع متشعب (زمن خطي حتى مع علامات الاقتباس المهربة)
+_SQ = r"(?:[^'\\\n]|\\.)"
+_DQ = r'(?:[^"\\\n]|\\.)'
+
+_PAIR_RE_OPT = re.compile(
+    r"(?:'(" + _SQ + r"{2,100})'|\"(" + _DQ + r"{2,100})\")[^\S\n]*=>[^\S\n]*"  # تحديد طول أقصى
+    r"(?:'(" + _SQ + r"{0,200})'|\"(" + _DQ + r"{0,200})\")"
+)
+
+_PAIR_RE_STD = re.compile(
+    r"(?:'(" + _SQ + r"+)'|\"(" + _DQ + r"+)\")[^\S\n]*=>[^\S\n]*"
+    r"(?:'(" + _SQ + r"*)'|\"(" + _DQ + r"*)\")"
+)
+
+# زوج مفتاح => قيمة عام لإعادة بناء الأسطر في مسار الاستبدال الاحتياطي (المفتاح يُطابق عبر قاموس)
+_FALLBACK_PAIR_RE = re.compile(r"""(?:'([^'\n]*)'|"([^"\n]*)")(\s*=>\s*)(?:'[^']*'|"[^"]*")""")
+
+# أقصى طول للسطر في المعالجة العادية (حماية من الأسطر الضخمة المولّدة آلياً)
+MAX_LINE_LENGTH = 2000
+
+# عدد صفوف CSV التي تُنسق في الذاكرة قبل كل كتابة إلى الملف
+CSV_CHUNK_ROWS = 8192
+
+_NEWLINE_RE = re.compile(r'\n')
+
+# سطر تعليق: // أو /* أو * أو # بعد المسافات البادئة
+_COMMENT_LINE_RE = re.compile(r'\s*(?://|/\*|\*|#)')
+
+# أنماط المتغيرات البرمجية والرموز و HTML في نمط واحد مثبت في بداية النص
+_SKIP_RE = re.compile(
+    r'^(?:'
+    r'https?://'  # URLs
+    r'|mailto:'  # emails
+    r'|(?:'
+    r'\$\w+'  # $variable
+    r'|\{\{.*\}\}'  # {{variable}}
+    r'|\w+\(\)'  # function()
+    r'|[^\w\s]+'  # رموز فقط
+    r'|\w+\.\w+'  # file.extension
+    r'|\d+[\.\-\s]*\d*'  # أرقام مع فواصل
+    r'|[A-Z_]+'  # CONSTANTS
+    r'|\w+\[\d+\]'  # array[index]
+    r'|<[^>]+>'  # HTML tag
+    r')$)'
+)
+
+_SYMBOLS_ONLY_RE = re.compile(r'^[\{\}\[\]<>/\\$#@%^&*()+=|~`]+$')
+_HTML_TAG_RE = re.compile(r'<[^>]+>')
+_findall_html = _HTML_TAG_RE.findall
+_WORD_RE = re.compile(r'\b[a-zA-Z]+\b')
+_SYMBOL_RE = re.compile(r'[^\w\s]')
+# تسلسلات الهروب في سلاسل PHP: \\ و \' و \" و \n و \t وبقية \حرف (تُحذف)
+_ESCAPE_RE = re.compile(r'\\([\\\'"a-zA-Z])')
+_ESCAPE_MAP = {'\\': '\\', "'": "'", '"': '"', 'n': '\n', 't': '\t'}
+_ALPHA_RE = re.compile(r'[a-zA-Z]')
+
+
+def _line_start_offsets(content):
+    """مواضع بداية كل سطر في المحتوى"""
+    return [0] + [m.end() for m in _NEWLINE_RE.finditer(content)]
+
+
+def _scan_chunk_worker(job):
+    """مسح جزء من المحتوى في عملية منفصلة (على مستوى الوحدة ليكون قابلاً للتسلسل)"""
+    chunk, base_offset, base_line = job
+    handler = PHPFileHandler()
+    handler.original_content = chunk
+    items = handler._scan_translation_pairs(_PAIR_RE_OPT, max_line_length=1000,
+                                            deduplicate=True)
+    
+    # تحويل أرقام الأسطر والمواضع من نسبية للجزء إلى مطلقة في الملف
+    for item in items:
+        item['line_number'] += base_line
+        start, end = item['value_span']
+        item['value_span'] = (start + base_offset, end + base_offset)
+    return items
+
+
+def _validate_chunk(columns):
+    """فحص جزء من أعمدة الترجمات (على مستوى الوحدة ليكون قابلاً للتسلسل)
+    
+    الأعمدة: النصوص الأصلية، الأصلية المطبّعة، الترجمات، يحتاج ترجمة، مترجم، أرقام الأسطر
+    """
+    issues = []
+    
+    for original, normalized, translated, needs, done, line_number in zip(*columns):
+        # فحص الترجمات الفارغة
+        if needs and not translated.strip():
+            issues.append({
+                'type': 'empty_translation',
+                'line': line_number,
+                'message': 'ترجمة فارغة'
+            })
+        
+        # فحص الترجمات المتطابقة مع الأصل
+        if (needs and not done and
+            normalized == translated.lower().strip()):
+            issues.append({
+                'type': 'unchanged_translation',
+                'line': line_number,
+                'message': 'لم تتغير عن النص الأصلي'
+            })
+            
+        # فحص الترجمات التي تحتوي على HTML غير متطابق
+        # (لا حاجة للفحص إذا تطابق النصان أو لم يحتوِ أي منهما على '<')
+        if original == translated or ('<' not in original and '<' not in translated):
+            continue
+        
+        if _findall_html(original) != _findall_html(translated):
+            issues.append({
+                'type': 'html_mismatch',
+                'line': line_number,
+                'message': 'عدم تطابق في HTML tags'
+            })
+    
+    return issues
+
+
+def _signature_chunk(texts):
+    """بصمات النصوص المطبّعة لجزء من العناصر (ثابتة بين العمليات بخلاف hash)"""
+    try:
+        from xxhash import xxh3_64_intdigest as signature
+    except ImportError:
+        from hashlib import blake2b
+        
+        def signature(text):
+            return int.from_bytes(blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=8).digest(), 'little')
+    
+    return [signature(text) for text in texts]
+
+
+def _escape_php_string(text, quote):
+    """تهريب النص لوضعه داخل سلسلة PHP محاطة بعلامة الاقتباس المحددة
+    
+    ما يكتبه يعيده _unescape_php_string كما هو (الشرطات المائلة وعلامات الاقتباس
+    وفواصل الأسطر والجدولة)، فلا تتضاعف الشرطات المائلة ولا تنكسر القيمة على
+    عدة أسطر. العكس ليس تاماً: فك الهروب يحذف بقية تسلسلات \\حرف (مثل \\x).
+    """
+    return (text.replace('\\', '\\\\').replace('\n', '\\n').replace('\t', '\\t')
+            .replace(quote, '\\' + quote))
+
+
+def _unescape_php_string(text):
+    """فك تسلسلات الهروب بمرور واحد (حتى لا يصبح \\n شرطة مائلة وسطراً جديداً)"""
+    return _ESCAPE_RE.sub(lambda match: _ESCAPE_MAP.get(match.group(1), ''), text)
+
+
+def _split_pair_match(match):
+    """تفكيك مطابقة النمط الموحّد إلى (المفتاح، القيمة، رقم النمط المستخدم)"""
+    key_single, key_double, value_single, value_double = match.groups()
+    if key_single is not None:
+        if value_single is not None:
+            return key_single, value_single, 0
+        return key_single, value_double, 2
+    if value_double is not None:
+        return key_double, value_double, 1
+    return key_double, value_single, 3
+
+def _backup_file(file_path):
+    """نسخ الملف الأصلي إلى ملف احتياطي بجانبه"""
+    try:
+        backup_path = create_backup_filename(file_path)
+        shutil.copy2(file_path, backup_path)
+        print(f"📄 تم إنشاء نسخة احتياطية: {backup_path.name}")
+        return backup_path
+    except Exception as e:
+        print(f"خطأ في إنشاء النسخة الاحتياطية: {e}")
+        return None
+
+
+class SaveSnapshot:
+    """كل ما يلزم لكتابة الملف المحفوظ، يُؤخذ من المعالج في خيط الواجهة
+    
+    لا يحمل أي مرجع للمعالج، فتحميل ملف أو مشروع آخر أثناء الكتابة في الخلفية
+    لا يغير ما يُكتب ولا مكانه.
+    """
+    
+    def __init__(self, content, replacements, save_path, encoding, source_path, translated_count):
+        self.content = content
+        self.replacements = replacements  # (بداية، نهاية، نص بديل) مرتبة
+        self.save_path = save_path
+        self.encoding = encoding
+        self.source_path = source_path  # الملف الأصلي (للنسخة الاحتياطية)
+        self.translated_count = translated_count
+        
+    def iter_content(self):
+        """توليد المحتوى الجديد كمقاطع متتالية دون بنائه كاملاً في الذاكرة"""
+        content = self.content
+        cursor = 0
+        for start, end, text in self.replacements:
+            yield content[cursor:start]
+            yield text
+            cursor = end
+        
+        yield content[cursor:]
+        
+    def write(self, create_backup=True):
+        """كتابة الملف (آمنة من أي خيط)"""
+        try:
+            # إنشاء نسخة احتياطية إذا طُلب ذلك
+            if create_backup and self.source_path:
+                _backup_file(self.source_path)
+            
+            # كتابة المحتوى الجديد مقطعاً مقطعاً إلى ملف مؤقت بنفس الترميز الأصلي
+            # ثم استبدال الملف دفعة واحدة حتى لا يبقى ملف نصف مكتوب عند الخطأ
+            save_path = self.save_path
+            temp_path = save_path.with_name(save_path.name + '.tmp')
+            try:
+                with open(temp_path, 'w', encoding=self.encoding, buffering=1 << 20) as f:
+                    f.writelines(self.iter_content())
+                os.replace(temp_path, save_path)
+            except Exception:
+                if temp_path.exists():
+                    temp_path.unlink()
+                raise
+            
+            # إحصائيات الحفظ
+            print(f"💾 تم حفظ الملف: {save_path.name}")
+            print(f"📊 تم حفظ {self.translated_count} ترجمة")
+            
+            return True
+            
+        except Exception as e:
+            raise Exception(f"خطأ في حفظ الملف: {str(e)}")
+
+
 class PHPFileHandler:
     """معالج ملفات PHP المحدث"""
     
+    # قوالب أنماط الاستبدال المختلفة حسب النمط المستخدم (يُملأ الحقل {0} فقط)
+    _REPLACEMENT_TEMPLATES = (
+        # نمط 0: اقتباسات فردية
+        (r"('{0}'\s*=>\s*')([^']*)'", r"\1{0}'"),
+        # نمط 1: اقتباسات مزدوجة
+        (r'("{0}"\s*=>\s*")([^"]*)"', r'\1{0}"'),
+        # نمط 2: مختلط فردي-مزدوج
+        (r"('{0}'\s*=>\s*\")([^\"]*)\"", r'\1{0}"'),
+        # نمط 3: مختلط مزدوج-فردي
+        (r'("{0}"\s*=>\s*\')([^\']*)\'', r"\1{0}'"),
+        # نمط للنصوص المباشرة
+        (r'\b{0}\b', r'{0}'),
+    )
+    
     def __init__(self):
         self.file_path = None
         self.original_content = ""
         self.translations = []
         self.modified = False
         self.encoding = 'utf-8'
+        self._line_starts = None
+        # ذاكرة الأنماط المترجمة لـ _update_line_translation
+        self._repl_cache = {}
+        # نتائج الإحصائيات والتحقق والتكرارات تُحفظ حتى أول تعديل على الترجمات
+        self._stats_cache = None
+        self._issues_cache = None
+        self._dups_cache = None
+        
+    @property
+    def translations(self):
+        """قائمة عناصر الترجمة (قواميس) كما يستخدمها باقي التطبيق"""
+        return self._translations
+    
+    @translations.setter
+    def translations(self, items):
+        """تعيين الترجمات مع إعادة بناء الأعمدة المرافقة"""
+        self._translations = items
+        self._rebuild_columns()
+        
+    def _rebuild_columns(self):
+        """بناء أعمدة متوازية للحقول التي تُقرأ في الإحصائيات والتصفية"""
+        items = self._translations
+        self._needs_col = bytearray(bool(item['needs_translation']) for item in items)
+        self._translated_col = bytearray(bool(item['is_translated']) for item in items)
+        self._type_col = [sys.intern(item.get('translation_type', 'none')) for item in items]
+        self._original_col = [item['original_value'] for item in items]
+        self._value_col = [item['translated_value'] for item in items]
+        self._line_col = array('l', (item['line_number'] for item in items))
+        # حالة الترجمة تُحسب عند الطلب وتُحفظ حتى يتغير العنصر
+        self._status_col = [None] * len(items)
+        # وجود العربي في النص الأصلي (لا يتغير بالتعديل) يُحسب عند أول حاجة إليه
+        self._orig_arabic_col = None
+        self._normalized_col = None
+        self._invalidate_caches()
+    
+    def _get_orig_arabic_col(self):
+        """عمود وجود المحتوى العربي في النصوص الأصلية (يُبنى مرة واحدة لكل مجموعة ترجمات)"""
+        if self._orig_arabic_col is None:
+            self._orig_arabic_col = bytearray(
+                map(has_arabic_content, self._original_col)
+            )
+        return self._orig_arabic_col
+    
+    def _get_normalized_col(self):
+        """النصوص الأصلية بعد التطبيع (أحرف صغيرة بدون مسافات طرفية) لمقارنة المكرر
+        
+        تُبنى مرة واحدة لكل مجموعة ترجمات وتُوحّد نسخها بـ sys.intern، فتتشارك
+        النصوص المتطابقة نفس الكائن وتُقارن بالهوية.
+        """
+        if self._normalized_col is None:
+            intern = sys.intern
+            self._normalized_col = [intern(original.lower().strip()) for original in self._original_col]
+        return self._normalized_col
+    
+    def _invalidate_caches(self):
+        """إلغاء النتائج المحفوظة بعد أي تعديل على الترجمات"""
+        self._stats_cache = None
+        self._issues_cache = None
+        self._dups_cache = None
+        
+    def _recompute_translated_flags(self):
+        """إعادة حساب حالة الترجمة دفعة واحدة (بعد الاستيراد مثلاً)"""
+        translated_col = self._translated_col
+        for index, item in enumerate(self._translations):
+            is_translated = has_arabic_content(item['translated_value'])
+            item['is_translated'] = is_translated
+            translated_col[index] = is_translated
+        self._invalidate_caches()
         
     def load_file(self, file_path):
         """تحميل ملف PHP مع دعم ترميزات متعددة"""
@@ -31,19 +356,15 @@ class PHPFileHandler:
             if self.file_path.suffix.lower() != '.php':
                 raise ValueError("يجب أن يكون الملف من نوع PHP (.php)")
                 
-            # محاولة قراءة الملف بترميزات مختلفة
-            encodings = ['utf-8', 'utf-8-sig', 'windows-1256', 'iso-8859-1', 'cp1252']
-            
-            for encoding in encodings:
-                try:
-                    with open(self.file_path, 'r', encoding=encoding) as f:
-                        self.original_content = f.read()
-                    self.encoding = encoding
-                    break
-                except UnicodeDecodeError:
-                    continue
-            else:
-                raise ValueError("لا يمكن قراءة الملف. تأكد من الترميز.")
+            # قراءة الملف مرة واحدة ثم فك الترميز من الذاكرة
+            raw = self.file_path.read_bytes()
+            content, self.encoding = self._decode_content(raw)
+            
+            # توحيد نهايات الأسطر كما في وضع القراءة النصي
+            if '\r' in content:
+                content = content.replace('\r\n', '\n').replace('\r', '\n')
+            self.original_content = content
+            self._line_starts = None  # مواضع الأسطر تُحسب عند الحاجة للمحتوى الجديد
                 
             # استخراج الترجمات
             self.translations = self._extract_translations()
@@ -57,6 +378,40 @@ class PHPFileHandler:
         except Exception as e:
             raise Exception(f"خطأ في تحميل الملف: {str(e)}")
             
+    def _decode_content(self, raw):
+        """فك ترميز محتوى الملف مع اكتشاف BOM والترميز دون إعادة القراءة"""
+        # ملف UTF-8 مع BOM
+        if raw.startswith(codecs.BOM_UTF8):
+            try:
+                return raw[len(codecs.BOM_UTF8):].decode('utf-8'), 'utf-8-sig'
+            except UnicodeDecodeError:
+                pass
+        
+        try:
+            return raw.decode('utf-8'), 'utf-8'
+        except UnicodeDecodeError:
+            pass
+        
+        legacy_encodings = ['windows-1256', 'iso-8859-1', 'cp1252']
+        
+        # اكتشاف الترميز تلقائياً إن كانت المكتبة متوفرة
+        try:
+            from charset_normalizer import from_bytes
+            best = from_bytes(raw, cp_isolation=legacy_encodings).best()
+            if best is not None:
+                return str(best), best.encoding
+        except ImportError:
+            pass
+        
+        # الترميزات التقليدية على نفس البايتات كحل أخير
+        for encoding in legacy_encodings:
+            try:
+                return raw.decode(encoding), encoding
+            except UnicodeDecodeError:
+                continue
+        
+        raise ValueError("لا يمكن قراءة الملف. تأكد من الترميز.")
+            
     def _extract_translations(self):
         """استخراج النصوص القابلة للترجمة مع تحسين الأداء للملفات الكبيرة"""
         translations = []
@@ -74,129 +429,158 @@ class PHPFileHandler:
     
     def _extract_translations_optimized(self):
         """استخراج محسن للملفات الكبيرة"""
-        translations = []
+        total_lines = self.original_content.count('\n') + 1
+        print(f"📄 معالجة {total_lines:,} سطر بمسح واحد")
         
-        # أنماط محسنة للملفات الكبيرة
-        patterns = [
-            r"'([^']{2,100})'\s*=>\s*'([^']{0,200})'",  # تحديد طول أقصى
-            r'"([^"]{2,100})"\s*=>\s*"([^"]{0,200})"',
-            r"'([^']{2,100})'\s*=>\s*\"([^\"]{0,200})\"",
-            r'"([^"]{2,100})"\s*=>\s*\'([^\']{0,200})\''
-        ]
-        
-        # معالجة بالتدفق للملفات الكبيرة
-        chunk_size = 10000  # معالجة 10000 سطر في المرة
-        lines = self.original_content.split('\n')
-        total_lines = len(lines)
-        
-        print(f"📄 معالجة {total_lines:,} سطر في مجموعات من {chunk_size}")
-        
-        for chunk_start in range(0, total_lines, chunk_size):
-            chunk_end = min(chunk_start + chunk_size, total_lines)
-            chunk_lines = lines[chunk_start:chunk_end]
-            
-            # معالجة المجموعة الحالية
-            chunk_translations = self._process_lines_chunk(chunk_lines, chunk_start, patterns)
-            translations.extend(chunk_translations)
-            
-            # تنظيف الذاكرة
-            del chunk_lines
-            
-            # إظهار التقدم
-            if chunk_end % 50000 == 0:
-                print(f"   📊 تم معالجة {chunk_end:,}/{total_lines:,} سطر ({(chunk_end/total_lines)*100:.1f}%)")
+        # تجنب الأسطر الطويلة جداً لتوفير الذاكرة
+        workers = os.cpu_count() or 1
+        if len(self.original_content) > PARALLEL_SCAN_THRESHOLD and workers > 1:
+            translations = self._scan_translation_pairs_parallel(workers)
+        else:
+            translations = self._scan_translation_pairs(_PAIR_RE_OPT, max_line_length=1000,
+                                                        deduplicate=True)
         
         print(f"✅ تم استخراج {len(translations)} عنصر من الملف الكبير")
-        return self._deduplicate_translations(translations)
+        return translations
     
     def _extract_translations_standard(self):
         """استخراج تقليدي للملفات العادية"""
-        translations = []
-        
-        patterns = [
-            r"'([^']+)'\s*=>\s*'([^']*)'",
-            r'"([^"]+)"\s*=>\s*"([^"]*)"',
-            r"'([^']+)'\s*=>\s*\"([^\"]*)\"",
-            r'"([^"]+)"\s*=>\s*\'([^\']*)\''
-        ]
+        return self._scan_translation_pairs(_PAIR_RE_STD, max_line_length=MAX_LINE_LENGTH)
+    
+    def _scan_translation_pairs_parallel(self, workers):
+        """مسح الملفات الكبيرة جداً على عدة عمليات، كل عملية على جزء من الأسطر"""
+        content = self.original_content
+        chunk_size = len(content) // workers + 1
+        
+        # تقسيم المحتوى على حدود الأسطر
+        jobs = []
+        start = 0
+        line_number = 0
+        while start < len(content):
+            end = content.find('\n', start + chunk_size)
+            end = len(content) if end == -1 else end + 1
+            jobs.append((content[start:end], start, line_number))
+            line_number += content.count('\n', start, end)
+            start = end
+        
+        print(f"⚙️ مسح متوازٍ على {len(jobs)} عملية")
         
-        lines = self.original_content.split('\n')
+        try:
+            from concurrent.futures import ProcessPoolExecutor  # استيراد عند الحاجة فقط
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                chunk_results = list(executor.map(_scan_chunk_worker, jobs))
+        except Exception as e:
+            print(f"⚠️ تعذر المسح المتوازي، استخدام المسح العادي: {e}")
+            return self._scan_translation_pairs(_PAIR_RE_OPT, max_line_length=1000,
+                                                deduplicate=True)
         
-        for line_number, line in enumerate(lines, 1):
-            line_stripped = line.strip()
-            
-            if (not line_stripped or 
-                line_stripped.startswith(('//','/*','*','#'))):
-                continue
-            
-            for pattern_index, pattern in enumerate(patterns):
-                matches = re.finditer(pattern, line)
-                
-                for match in matches:
-                    key = self._clean_extracted_text(match.group(1))
-                    value = self._clean_extracted_text(match.group(2))
-                    
-                    if self._is_valid_translation_pair(key, value):
-                        translation_item = {
-                            'line_number': line_number,
-                            'key': key,
-                            'original_value': value,
-                            'translated_value': value,
-                            'is_translated': has_arabic_content(value),
-                            'original_line': line.strip(),
-                            'needs_translation': self._needs_translation(value),
-                            'pattern_used': pattern_index,
-                            'translation_type': 'none'
-                        }
-                        
-                        translations.append(translation_item)
+        # دمج النتائج بالترتيب مع إزالة المكرر عبر الأجزاء
+        translations = []
+        seen = set()
+        for items in chunk_results:
+            for item in items:
+                unique_key = (item['key'].lower(), item['original_value'].lower())
+                if unique_key not in seen:
+                    seen.add(unique_key)
+                    translations.append(item)
+        
+        removed_count = sum(len(items) for items in chunk_results) - len(translations)
+        if removed_count > 0:
+            print(f"🔄 تم إزالة {removed_count} عنصر مكرر")
         
         return translations
     
-    def _process_lines_chunk(self, lines, start_line_number, patterns):
-        """معالجة مجموعة من الأسطر"""
-        chunk_translations = []
-        
-        for line_index, line in enumerate(lines):
-            line_number = start_line_number + line_index + 1
-            line_stripped = line.strip()
+    def _scan_translation_pairs(self, pattern, max_line_length=None, deduplicate=False):
+        """مسح المحتوى كاملاً بالنمط الموحّد دون تقسيمه إلى أسطر"""
+        translations = []
+        seen = set()
+        removed_count = 0
+        
+        # مجمع نصوص: النصوص المتطابقة (مفاتيح وقيم مكررة) تشترك في كائن واحد
+        string_pool = {}
+        content = self.original_content
+        content_length = len(content)
+        
+        # ربط الدوال المستخدمة في الحلقة بأسماء محلية لتقليل كلفة البحث عن الخصائص
+        clean_text = self._clean_extracted_text
+        is_valid_pair = self._is_valid_translation_pair
+        needs_translation = self._needs_translation
+        match_comment = _COMMENT_LINE_RE.match
+        find_pairs = pattern.finditer
+        pool = string_pool.setdefault
+        append = translations.append
+        count_newlines = content.count
+        find = content.find
+        rfind = content.rfind
+        
+        # كل الأنماط تتطلب '=>'، لذلك ننتقل مباشرة من سهم إلى السطر الذي يليه
+        # ولا يُطبق النمط إلا على الأسطر التي تحتوي عليه.
+        # رقم السطر يُحسب تدريجياً بعدّ فواصل الأسطر بين الأسطر المفحوصة
+        line_index = 0
+        counted_to = 0
+        arrow = find('=>')
+        
+        while arrow != -1:
+            line_start = rfind('\n', 0, arrow) + 1
+            line_end = find('\n', arrow)
+            if line_end == -1:
+                line_end = content_length
+            arrow = find('=>', line_end)
             
-            if (not line_stripped or 
-                line_stripped.startswith(('//','/*','*','#'))):
+            # تجنب التعليقات والأسطر الطويلة دون نسخ السطر أو تقليمه
+            if (match_comment(content, line_start, line_end) is not None or
+                (max_line_length is not None and line_end - line_start > max_line_length)):
                 continue
             
-            # تجنب الأسطر الطويلة جداً لتوفير الذاكرة
-            if len(line) > 1000:
-                continue
+            line_counted = False
             
-            for pattern_index, pattern in enumerate(patterns):
-                try:
-                    matches = re.finditer(pattern, line)
-                    
-                    for match in matches:
-                        key = self._clean_extracted_text(match.group(1))
-                        value = self._clean_extracted_text(match.group(2))
-                        
-                        if self._is_valid_translation_pair(key, value):
-                            translation_item = {
-                                'line_number': line_number,
-                                'key': key,
-                                'original_value': value,
-                                'translated_value': value,
-                                'is_translated': has_arabic_content(value),
-                                'original_line': line.strip()[:500],  # تقصير للذاكرة
-                                'needs_translation': self._needs_translation(value),
-                                'pattern_used': pattern_index,
-                                'translation_type': 'none'
-                            }
-                            
-                            chunk_translations.append(translation_item)
-                            
-                except re.error:
-                    # تجاهل أخطاء regex للأسطر المعقدة
+            for match in find_pairs(content, line_start, line_end):
+                key, value, pattern_index = _split_pair_match(match)
+                key = clean_text(key)
+                value = clean_text(value)
+                
+                if not is_valid_pair(key, value):
                     continue
+                
+                # إزالة المكرر أثناء الاستخراج بدلاً من مرور ثانٍ على القائمة
+                if deduplicate:
+                    unique_key = (key.lower(), value.lower())
+                    if unique_key in seen:
+                        removed_count += 1
+                        continue
+                    seen.add(unique_key)
+                
+                # رقم السطر يُحسب مرة واحدة للسطر عند أول زوج صالح فيه
+                if not line_counted:
+                    line_index += count_newlines('\n', counted_to, line_start)
+                    counted_to = line_start
+                    line_counted = True
+                
+                key = pool(key, key)
+                value = pool(value, value)
+                
+                # النص العربي لا يحتاج ترجمة، فلا داعي لإعادة فحصه
+                is_translated = has_arabic_content(value)
+                
+                translation_item = {
+                    'line_number': line_index + 1,
+                    'key': key,
+                    'original_value': value,
+                    'translated_value': value,
+                    'is_translated': is_translated,
+                    'needs_translation': False if is_translated else needs_translation(value),
+                    'pattern_used': pattern_index,
+                    'translation_type': 'none',
+                    # موضع القيمة في المحتوى لإعادة كتابتها مباشرة عند الحفظ
+                    'value_span': match.span(3 if pattern_index in (0, 3) else 4)
+                }
+                
+                append(translation_item)
         
-        return chunk_translations
+        if removed_count > 0:
+            print(f"🔄 تم إزالة {removed_count} عنصر مكرر")
+        
+        return translations
     
     def _is_valid_translation_pair(self, key, value):
         """التحقق من صحة زوج الترجمة"""
@@ -209,7 +593,10 @@ class PHPFileHandler:
             return False
             
         # تجنب النصوص التي تحتوي على رموز برمجية فقط
-        if re.match(r'^[\{\}\[\]<>/\\$#@%^&*()+=|~`]+
+        if _SYMBOLS_ONLY_RE.match(value):
+            return False
+            
+        return True
     
     def _clean_extracted_text(self, text):
         """تنظيف النص المستخرج"""
@@ -219,13 +606,12 @@ class PHPFileHandler:
         # إزالة المسافات الزائدة
         text = text.strip()
         
-        # إزالة escape characters
-        text = text.replace('\\n', '\n').replace('\\t', '\t').replace('\\"', '"').replace("\\'", "'")
-        
-        # إزالة الأكواد الخاصة
-        text = re.sub(r'\\[a-zA-Z]', '', text)
+        # لا توجد أي تسلسلات هروب في معظم النصوص
+        if '\\' not in text:
+            return text
         
-        return text
+        # فك escape characters وإزالة الأكواد الخاصة
+        return _unescape_php_string(text)
     
     def _needs_translation(self, text):
         """تحديد ما إذا كان النص يحتاج لترجمة مع منطق محسن"""
@@ -242,26 +628,8 @@ class PHPFileHandler:
         if text.isdigit():
             return False
             
-        # تخطي المتغيرات البرمجية والرموز
-        programming_patterns = [
-            r'^\$\w+$',  # $variable
-            r'^\{\{.*\}\}$',  # {{variable}}
-            r'^\w+\(\)$',  # function()
-            r'^[^\w\s]+$',  # رموز فقط
-            r'^\w+\.\w+$',  # file.extension
-            r'^https?://',  # URLs
-            r'^mailto:',  # emails
-            r'^\d+[\.\-\s]*\d*$',  # أرقام مع فواصل
-            r'^[A-Z_]+$',  # CONSTANTS
-            r'^\w+\[\d+\]$'  # array[index]
-        ]
-        
-        for pattern in programming_patterns:
-            if re.match(pattern, text):
-                return False
-        
-        # تخطي HTML tags
-        if re.match(r'^<[^>]+>$', text):
+        # تخطي المتغيرات البرمجية والرموز و HTML tags
+        if _SKIP_RE.match(text):
             return False
             
         # تخطي النصوص التي تحتوي على عربي بالفعل
@@ -269,35 +637,48 @@ class PHPFileHandler:
             return False
             
         # تخطي النصوص التي تحتوي على رموز برمجية أكثر من كلمات
-        word_count = len(re.findall(r'\b[a-zA-Z]+\b', text))
-        symbol_count = len(re.findall(r'[^\w\s]', text))
+        word_count = len(_WORD_RE.findall(text))
+        symbol_count = len(_SYMBOL_RE.findall(text))
         
         if symbol_count > word_count and word_count < 3:
             return False
         
         # يحتاج للترجمة إذا كان يحتوي على حروف إنجليزية
-        return bool(re.search(r'[a-zA-Z]', text)) and word_count > 0
+        return bool(_ALPHA_RE.search(text)) and word_count > 0
     
     def update_translation(self, index, translated_text, translation_type='manual'):
         """تحديث ترجمة معينة مع نوع الترجمة"""
         if 0 <= index < len(self.translations):
+            is_translated = has_arabic_content(translated_text)
+            was_translated = self._translated_col[index]
+            old_type = self._type_col[index]
             self.translations[index]['translated_value'] = translated_text
-            self.translations[index]['is_translated'] = has_arabic_content(translated_text)
+            self.translations[index]['is_translated'] = is_translated
             self.translations[index]['translation_type'] = translation_type
+            
+            # مزامنة الأعمدة
+            self._translated_col[index] = is_translated
+            self._type_col[index] = translation_type
+            self._value_col[index] = translated_text
+            self._status_col[index] = None
+            
+            # الإحصائيات تُعدّل بالفرق بدلاً من إعادة حسابها، والباقي يُلغى
+            self._adjust_statistics(index, was_translated, old_type, is_translated, translation_type)
+            self._issues_cache = None
+            self._dups_cache = None
             self.modified = True
             return True
         return False
     
     def get_untranslated_items(self):
         """الحصول على العناصر غير المترجمة"""
-        return [item for item in self.translations 
-                if item['needs_translation'] and not has_arabic_content(item['translated_value'])]
+        return [item for item, needs, done in zip(self.translations, self._needs_col, self._translated_col)
+                if needs and not done]
     
     def get_translation_progress(self):
         """الحصول على تقدم الترجمة بناءً على المحتوى العربي"""
-        total_items = len([item for item in self.translations if item['needs_translation']])
-        translated_items = len([item for item in self.translations 
-                              if item['needs_translation'] and has_arabic_content(item['translated_value'])])
+        total_items = sum(self._needs_col)
+        translated_items = sum(map(and_, self._needs_col, self._translated_col))
         
         if total_items == 0:
             return 100
@@ -309,480 +690,191 @@ class PHPFileHandler:
         if not self.file_path:
             return None
             
-        try:
-            backup_path = create_backup_filename(self.file_path)
-            shutil.copy2(self.file_path, backup_path)
-            print(f"📄 تم إنشاء نسخة احتياطية: {backup_path.name}")
-            return backup_path
-        except Exception as e:
-            print(f"خطأ في إنشاء النسخة الاحتياطية: {e}")
-            return None
+        return _backup_file(self.file_path)
     
     def save_file(self, output_path=None, create_backup=True):
         """حفظ الملف مع الترجمات مع تحسينات"""
+        snapshot = self.snapshot_for_save(output_path)
+        self.modified = False
         try:
-            # إنشاء نسخة احتياطية إذا طُلب ذلك
-            if create_backup and self.file_path:
-                self.create_backup()
-            
-            # تحديد مسار الحفظ
-            save_path = Path(output_path) if output_path else self.file_path
-            
-            # إنشاء المحتوى الجديد
-            new_content = self._build_new_content()
-            
-            # حفظ الملف بنفس الترميز الأصلي
-            with open(save_path, 'w', encoding=self.encoding) as f:
-                f.write(new_content)
-                
-            self.modified = False
-            
-            # إحصائيات الحفظ
-            translated_count = len([t for t in self.translations if has_arabic_content(t['translated_value'])])
-            print(f"💾 تم حفظ الملف: {save_path.name}")
-            print(f"📊 تم حفظ {translated_count} ترجمة")
-            
-            return True
-            
-        except Exception as e:
-            raise Exception(f"خطأ في حفظ الملف: {str(e)}")
+            return snapshot.write(create_backup)
+        except Exception:
+            self.modified = True
+            raise
     
-    def _build_new_content(self):
-        """بناء المحتوى الجديد مع الترجمات مع خوارزمية محسنة"""
-        new_content = self.original_content
-        
-        # ترتيب الترجمات حسب رقم السطر (من الأسفل للأعلى)
-        sorted_translations = sorted(self.translations, key=lambda x: x['line_number'], reverse=True)
-        
-        lines = new_content.split('\n')
-        
-        for translation in sorted_translations:
-            # تحديث فقط الترجمات المعدلة والتي تحتوي على عربي
-            if (translation['is_translated'] and 
-                has_arabic_content(translation['translated_value']) and
+    def snapshot_for_save(self, output_path=None):
+        """أخذ نسخة الحفظ من الحالة الحالية (في خيط الواجهة) لتُكتب بـ SaveSnapshot.write"""
+        save_path = Path(output_path) if output_path else self.file_path
+        return SaveSnapshot(
+            self.original_content,
+            self._collect_replacements(),
+            save_path,
+            self.encoding,
+            self.file_path,
+            sum(self._translated_col)
+        )
+    
+    def _collect_replacements(self):
+        """مواضع الترجمات في المحتوى الأصلي كـ (بداية، نهاية، نص بديل) مرتبة"""
+        content = self.original_content
+        total_lines = content.count('\n') + 1
+        
+        # تجميع الترجمات المعدلة حسب السطر (فقط التي تحتوي على عربي)
+        edits = {}
+        for translation, is_translated in zip(self.translations, self._translated_col):
+            if (is_translated and
                 translation['translated_value'] != translation['original_value']):
                 
                 line_index = translation['line_number'] - 1
-                
-                if 0 <= line_index < len(lines):
-                    original_line = lines[line_index]
-                    updated_line = self._update_line_translation(
-                        original_line, 
-                        translation['original_value'], 
-                        translation['translated_value'],
-                        translation['pattern_used']
-                    )
-                    
-                    if updated_line != original_line:
-                        lines[line_index] = updated_line
+                if 0 <= line_index < total_lines:
+                    edits.setdefault(line_index, []).append(translation)
         
-        return '\n'.join(lines)
-    
-    def _update_line_translation(self, line, original_value, new_value, pattern_used):
-        """تحديث ترجمة في سطر معين"""
-        # تنظيف القيم
-        original_escaped = re.escape(original_value)
-        new_value_safe = new_value.replace("'", "\\'").replace('"', '\\"')
-        
-        # أنماط الاستبدال المختلفة حسب النمط المستخدم
-        replacement_patterns = [
-            # نمط 0: اقتباسات فردية
-            (rf"('{original_escaped}'\s*=>\s*')([^']*)'", rf"\1{new_value_safe}'"),
-            # نمط 1: اقتباسات مزدوجة  
-            (rf'("{original_escaped}"\s*=>\s*")([^"]*)"', rf'\1{new_value_safe}"'),
-            # نمط 2: مختلط فردي-مزدوج
-            (rf"('{original_escaped}'\s*=>\s*\")([^\"]*)\"", rf'\1{new_value_safe}"'),
-            # نمط 3: مختلط مزدوج-فردي
-            (rf'("{original_escaped}"\s*=>\s*\')([^\']*)\'', rf"\1{new_value_safe}'"),
-            # نمط للنصوص المباشرة
-            (rf'\b{original_escaped}\b', new_value_safe)
-        ]
-        
-        # محاولة الاستبدال
-        for pattern, replacement in replacement_patterns:
-            if re.search(pattern, line):
-                updated_line = re.sub(pattern, replacement, line)
-                if updated_line != line:
-                    return updated_line
-        
-        # استبدال مباشر كحل أخير
-        if original_value in line:
-            return line.replace(original_value, new_value_safe)
+        # كل تعديل هو (بداية، نهاية، نص بديل): موضع القيمة مباشرة إن كان معروفاً،
+        # وإلا يُعاد بناء السطر كاملاً بالاستبدال عبر الأنماط
+        replacements = []
+        fallback_lines = []
         
-        return line
-    
-    def export_translations_csv(self, output_path):
-        """تصدير الترجمات إلى ملف CSV مع معلومات إضافية"""
-        try:
-            import csv
+        for line_index, line_translations in edits.items():
+            spans = [self._valid_value_span(translation) for translation in line_translations]
             
-            with open(output_path, 'w', newline='', encoding='utf-8-sig') as csvfile:
-                writer = csv.writer(csvfile)
-                
-                # كتابة العناوين المحسنة
-                writer.writerow([
-                    'رقم السطر', 'المفتاح', 'النص الأصلي', 'الترجمة', 
-                    'الحالة', 'يحتاج ترجمة', 'نوع الترجمة', 'النمط المستخدم'
-                ])
-                
-                # كتابة البيانات
-                for item in self.translations:
-                    status = determine_translation_status(item['original_value'], item['translated_value'])
-                    
-                    writer.writerow([
-                        item['line_number'],
-                        item['key'],
-                        item['original_value'],
-                        item['translated_value'],
-                        status,
-                        'نعم' if item['needs_translation'] else 'لا',
-                        item.get('translation_type', 'none'),
-                        item.get('pattern_used', 0)
-                    ])
-                    
-            print(f"📊 تم تصدير {len(self.translations)} عنصر إلى CSV")
-            return True
+            if None not in spans:
+                for (start, end), translation in zip(spans, line_translations):
+                    quote = content[start - 1]
+                    replacements.append((start, end, _escape_php_string(translation['translated_value'], quote)))
+                continue
             
-        except Exception as e:
-            raise Exception(f"خطأ في تصدير CSV: {str(e)}")
-    
-    def get_statistics(self):
-        """الحصول على إحصائيات مفصلة"""
-        total = len(self.translations)
-        needs_translation = len([item for item in self.translations if item['needs_translation']])
-        
-        # حساب المترجم بناءً على المحتوى العربي
-        translated = len([item for item in self.translations 
-                         if item['needs_translation'] and has_arabic_content(item['translated_value'])])
-        
-        auto_translated = len([item for item in self.translations 
-                              if item.get('translation_type') == 'auto' and has_arabic_content(item['translated_value'])])
+            fallback_lines.append((line_index, line_translations))
         
-        manual_translated = len([item for item in self.translations 
-                                if item.get('translation_type') == 'manual' and has_arabic_content(item['translated_value'])])
+        if fallback_lines:
+            replacements.extend(self._rewrite_fallback_lines(fallback_lines))
         
-        return {
-            'total_items': total,
-            'needs_translation': needs_translation,
-            'translated': translated,
-            'remaining': needs_translation - translated,
-            'progress_percentage': self.get_translation_progress(),
-            'auto_translated': auto_translated,
-            'manual_translated': manual_translated,
-            'has_arabic_originally': len([item for item in self.translations 
-                                        if has_arabic_content(item['original_value'])])
-        }
+        replacements.sort()
+        return replacements
     
-    def get_translation_by_status(self, status_filter):
-        """الحصول على ترجمات حسب الحالة"""
-        filtered_items = []
-        
-        for item in self.translations:
-            status = determine_translation_status(item['original_value'], item['translated_value'])
+    def _rewrite_fallback_lines(self, fallback_lines):
+        """إعادة بناء الأسطر التي لا تملك مواضع قيم صالحة بتعبير منتظم واحد مجمّع
+        
+        يُطبق نمط واحد لأزواج المفتاح => القيمة بمرور واحد على كل سطر ويُبحث عن
+        المفتاح في قاموس القيم الجديدة، ثم يُلجأ إلى _update_line_translation فقط
+        للعناصر التي لم يطابقها النمط.
+        """
+        for line_index, line_translations in fallback_lines:
+            line_start, line_end = self._line_bounds(line_index + 1)
+            line = self.original_content[line_start:line_end]
             
-            if status_filter == "all" or status == status_filter:
-                filtered_items.append(item)
-                
-        return filtered_items
-    
-    def find_duplicates(self):
-        """البحث عن النصوص المكررة"""
-        seen = {}
-        duplicates = []
-        
-        for item in self.translations:
-            original = item['original_value'].lower().strip()
-            if original in seen:
-                duplicates.append({
-                    'text': original,
-                    'lines': [seen[original]['line_number'], item['line_number']],
-                    'keys': [seen[original]['key'], item['key']]
-                })
-            else:
-                seen[original] = item
-                
-        return duplicates
-    
-    def validate_translations(self):
-        """التحقق من صحة الترجمات"""
-        issues = []
-        
-        for i, item in enumerate(self.translations):
-            original = item['original_value']
-            translated = item['translated_value']
-            
-            # فحص الترجمات الفارغة
-            if item['needs_translation'] and not translated.strip():
-                issues.append({
-                    'type': 'empty_translation',
-                    'line': item['line_number'],
-                    'message': 'ترجمة فارغة'
-                })
-            
-            # فحص الترجمات المتطابقة مع الأصل
-            if (item['needs_translation'] and 
-                original.strip().lower() == translated.strip().lower() and
-                not has_arabic_content(translated)):
-                issues.append({
-                    'type': 'unchanged_translation',
-                    'line': item['line_number'],
-                    'message': 'لم تتغير عن النص الأصلي'
-                })
-                
-            # فحص الترجمات التي تحتوي على HTML غير متطابق
-            original_html = re.findall(r'<[^>]+>', original)
-            translated_html = re.findall(r'<[^>]+>', translated)
+            # القيمة الجديدة لكل مفتاح في هذا السطر (الأخيرة تفوز كما في الاستبدال المتتالي)
+            line_values = {
+                translation['original_value']: translation['translated_value']
+                for translation in line_translations
+            }
+            matched = set()
             
-            if original_html != translated_html:
-                issues.append({
-                    'type': 'html_mismatch',
-                    'line': item['line_number'],
-                    'message': 'عدم تطابق في HTML tags'
-                })
-        
-        return issues
-    
-    def export_project_data(self):
-        """تصدير بيانات المشروع للحفظ"""
-        return {
-            'file_path': str(self.file_path) if self.file_path else None,
-            'encoding': self.encoding,
-            'translations': self.translations,
-            'statistics': self.get_statistics(),
-            'validation_issues': self.validate_translations(),
-            'duplicates': self.find_duplicates()
-        }
-    
-    def import_project_data(self, project_data):
-        """استيراد بيانات المشروع"""
-        try:
-            self.file_path = Path(project_data['file_path']) if project_data.get('file_path') else None
-            self.encoding = project_data.get('encoding', 'utf-8')
-            self.translations = project_data.get('translations', [])
-            self.modified = True
+            def _replace(match):
+                key = match.group(1) if match.group(1) is not None else match.group(2)
+                new_value = line_values.get(key)
+                if new_value is None:
+                    return match.group(0)
+                matched.add(key)
+                key_quote = match.string[match.start()]
+                value_quote = match.string[match.end(3)]
+                new_value = _escape_php_string(new_value, value_quote)
+                return f"{key_quote}{key}{key_quote}{match.group(3)}{value_quote}{new_value}{value_quote}"
             
-            print(f"📂 تم استيراد مشروع يحتوي على {len(self.translations)} عنصر")
-            return True
+            line = _FALLBACK_PAIR_RE.sub(_replace, line)
             
-        except Exception as e:
-            raise Exception(f"خطأ في استيراد بيانات المشروع: {str(e)}")
-, value):
-            return False
+            # العناصر التي لم تظهر كزوج مفتاح => قيمة تعود للاستبدال بالأنماط الفردية
+            for translation in line_translations:
+                if translation['original_value'] not in matched:
+                    line = self._update_line_translation(
+                        line,
+                        translation['original_value'],
+                        translation['translated_value'],
+                        translation['pattern_used']
+                    )
             
-        return True
+            yield line_start, line_end, line
     
-    def _deduplicate_translations(self, translations):
-        """إزالة الترجمات المكررة"""
-        seen = set()
-        unique_translations = []
+    def get_original_line(self, index):
+        """نص السطر الأصلي لعنصر ترجمة، يُستخرج من المحتوى عند الطلب بدلاً من تخزينه في كل عنصر"""
+        item = self.translations[index]
         
-        for item in translations:
-            # إنشاء مفتاح فريد للمقارنة
-            unique_key = (item['key'].lower(), item['original_value'].lower())
-            
-            if unique_key not in seen:
-                seen.add(unique_key)
-                unique_translations.append(item)
+        # مشاريع محفوظة بإصدارات سابقة تخزن السطر مع العنصر
+        if 'original_line' in item:
+            return item['original_line']
         
-        removed_count = len(translations) - len(unique_translations)
-        if removed_count > 0:
-            print(f"🔄 تم إزالة {removed_count} عنصر مكرر")
-        
-        return unique_translations
-    
-    def _clean_extracted_text(self, text):
-        """تنظيف النص المستخرج"""
-        if not text:
+        line_number = item['line_number']
+        if not 1 <= line_number <= len(self._get_line_starts()):
             return ""
-            
-        # إزالة المسافات الزائدة
-        text = text.strip()
-        
-        # إزالة escape characters
-        text = text.replace('\\n', '\n').replace('\\t', '\t').replace('\\"', '"').replace("\\'", "'")
         
-        # إزالة الأكواد الخاصة
-        text = re.sub(r'\\[a-zA-Z]', '', text)
-        
-        return text
+        line_start, line_end = self._line_bounds(line_number)
+        return self.original_content[line_start:line_end].strip()
     
-    def _needs_translation(self, text):
-        """تحديد ما إذا كان النص يحتاج لترجمة مع منطق محسن"""
-        if not text or not isinstance(text, str):
-            return False
-            
-        text = text.strip()
-        
-        # تخطي النصوص الفارغة أو القصيرة جداً
-        if len(text) < 2:
-            return False
-            
-        # تخطي الأرقام فقط
-        if text.isdigit():
-            return False
-            
-        # تخطي المتغيرات البرمجية والرموز
-        programming_patterns = [
-            r'^\$\w+$',  # $variable
-            r'^\{\{.*\}\}$',  # {{variable}}
-            r'^\w+\(\)$',  # function()
-            r'^[^\w\s]+$',  # رموز فقط
-            r'^\w+\.\w+$',  # file.extension
-            r'^https?://',  # URLs
-            r'^mailto:',  # emails
-            r'^\d+[\.\-\s]*\d*$',  # أرقام مع فواصل
-            r'^[A-Z_]+$',  # CONSTANTS
-            r'^\w+\[\d+\]$'  # array[index]
-        ]
-        
-        for pattern in programming_patterns:
-            if re.match(pattern, text):
-                return False
-        
-        # تخطي HTML tags
-        if re.match(r'^<[^>]+>$', text):
-            return False
-            
-        # تخطي النصوص التي تحتوي على عربي بالفعل
-        if has_arabic_content(text):
-            return False
-            
-        # تخطي النصوص التي تحتوي على رموز برمجية أكثر من كلمات
-        word_count = len(re.findall(r'\b[a-zA-Z]+\b', text))
-        symbol_count = len(re.findall(r'[^\w\s]', text))
-        
-        if symbol_count > word_count and word_count < 3:
-            return False
-        
-        # يحتاج للترجمة إذا كان يحتوي على حروف إنجليزية
-        return bool(re.search(r'[a-zA-Z]', text)) and word_count > 0
-    
-    def update_translation(self, index, translated_text, translation_type='manual'):
-        """تحديث ترجمة معينة مع نوع الترجمة"""
-        if 0 <= index < len(self.translations):
-            self.translations[index]['translated_value'] = translated_text
-            self.translations[index]['is_translated'] = has_arabic_content(translated_text)
-            self.translations[index]['translation_type'] = translation_type
-            self.modified = True
-            return True
-        return False
-    
-    def get_untranslated_items(self):
-        """الحصول على العناصر غير المترجمة"""
-        return [item for item in self.translations 
-                if item['needs_translation'] and not has_arabic_content(item['translated_value'])]
+    def _get_line_starts(self):
+        """مواضع بداية الأسطر، تُحسب مرة واحدة لكل ملف محمّل"""
+        if self._line_starts is None:
+            self._line_starts = _line_start_offsets(self.original_content)
+        return self._line_starts
     
-    def get_translation_progress(self):
-        """الحصول على تقدم الترجمة بناءً على المحتوى العربي"""
-        total_items = len([item for item in self.translations if item['needs_translation']])
-        translated_items = len([item for item in self.translations 
-                              if item['needs_translation'] and has_arabic_content(item['translated_value'])])
-        
-        if total_items == 0:
-            return 100
-            
-        return int((translated_items / total_items) * 100)
+    def _line_bounds(self, line_number):
+        """بداية ونهاية السطر (يبدأ الترقيم من 1)"""
+        line_starts = self._get_line_starts()
+        line_start = line_starts[line_number - 1]
+        if line_number < len(line_starts):
+            return line_start, line_starts[line_number] - 1
+        return line_start, len(self.original_content)
     
-    def create_backup(self):
-        """إنشاء نسخة احتياطية من الملف الأصلي"""
-        if not self.file_path:
-            return None
-            
-        try:
-            backup_path = create_backup_filename(self.file_path)
-            shutil.copy2(self.file_path, backup_path)
-            print(f"📄 تم إنشاء نسخة احتياطية: {backup_path.name}")
-            return backup_path
-        except Exception as e:
-            print(f"خطأ في إنشاء النسخة الاحتياطية: {e}")
+    def _valid_value_span(self, translation):
+        """موضع القيمة في المحتوى الأصلي إذا كان لا يزال يطابقها"""
+        span = translation.get('value_span')
+        if not span:
             return None
-    
-    def save_file(self, output_path=None, create_backup=True):
-        """حفظ الملف مع الترجمات مع تحسينات"""
-        try:
-            # إنشاء نسخة احتياطية إذا طُلب ذلك
-            if create_backup and self.file_path:
-                self.create_backup()
-            
-            # تحديد مسار الحفظ
-            save_path = Path(output_path) if output_path else self.file_path
-            
-            # إنشاء المحتوى الجديد
-            new_content = self._build_new_content()
-            
-            # حفظ الملف بنفس الترميز الأصلي
-            with open(save_path, 'w', encoding=self.encoding) as f:
-                f.write(new_content)
-                
-            self.modified = False
-            
-            # إحصائيات الحفظ
-            translated_count = len([t for t in self.translations if has_arabic_content(t['translated_value'])])
-            print(f"💾 تم حفظ الملف: {save_path.name}")
-            print(f"📊 تم حفظ {translated_count} ترجمة")
-            
-            return True
-            
-        except Exception as e:
-            raise Exception(f"خطأ في حفظ الملف: {str(e)}")
-    
-    def _build_new_content(self):
-        """بناء المحتوى الجديد مع الترجمات مع خوارزمية محسنة"""
-        new_content = self.original_content
         
-        # ترتيب الترجمات حسب رقم السطر (من الأسفل للأعلى)
-        sorted_translations = sorted(self.translations, key=lambda x: x['line_number'], reverse=True)
+        start, end = span
+        content = self.original_content
+        if not (0 < start <= end < len(content)):
+            return None
         
-        lines = new_content.split('\n')
+        quote = content[start - 1]
+        if quote not in ('"', "'") or content[end] != quote:
+            return None
         
-        for translation in sorted_translations:
-            # تحديث فقط الترجمات المعدلة والتي تحتوي على عربي
-            if (translation['is_translated'] and 
-                has_arabic_content(translation['translated_value']) and
-                translation['translated_value'] != translation['original_value']):
-                
-                line_index = translation['line_number'] - 1
-                
-                if 0 <= line_index < len(lines):
-                    original_line = lines[line_index]
-                    updated_line = self._update_line_translation(
-                        original_line, 
-                        translation['original_value'], 
-                        translation['translated_value'],
-                        translation['pattern_used']
-                    )
-                    
-                    if updated_line != original_line:
-                        lines[line_index] = updated_line
+        # مشروع مستورد أو محتوى مختلف: نعود للاستبدال عبر الأنماط
+        if self._clean_extracted_text(content[start:end]) != translation['original_value']:
+            return None
         
-        return '\n'.join(lines)
+        return start, end
     
     def _update_line_translation(self, line, original_value, new_value, pattern_used):
         """تحديث ترجمة في سطر معين"""
+        # كل الأنماط تحتوي النص الأصلي حرفياً، فلا داعي لتشغيلها إن لم يكن في السطر
+        if original_value not in line:
+            return line
+        
         # تنظيف القيم
-        original_escaped = re.escape(original_value)
-        new_value_safe = new_value.replace("'", "\\'").replace('"', '\\"')
-        
-        # أنماط الاستبدال المختلفة حسب النمط المستخدم
-        replacement_patterns = [
-            # نمط 0: اقتباسات فردية
-            (rf"('{original_escaped}'\s*=>\s*')([^']*)'", rf"\1{new_value_safe}'"),
-            # نمط 1: اقتباسات مزدوجة  
-            (rf'("{original_escaped}"\s*=>\s*")([^"]*)"', rf'\1{new_value_safe}"'),
-            # نمط 2: مختلط فردي-مزدوج
-            (rf"('{original_escaped}'\s*=>\s*\")([^\"]*)\"", rf'\1{new_value_safe}"'),
-            # نمط 3: مختلط مزدوج-فردي
-            (rf'("{original_escaped}"\s*=>\s*\')([^\']*)\'', rf"\1{new_value_safe}'"),
-            # نمط للنصوص المباشرة
-            (rf'\b{original_escaped}\b', new_value_safe)
-        ]
-        
-        # محاولة الاستبدال
-        for pattern, replacement in replacement_patterns:
-            if re.search(pattern, line):
-                updated_line = re.sub(pattern, replacement, line)
-                if updated_line != line:
-                    return updated_line
+        new_value_safe = (new_value.replace('\\', '\\\\').replace('\n', '\\n').replace('\t', '\\t')
+                          .replace("'", "\\'").replace('"', '\\"'))
+        # نص الاستبدال في subn يفك الشرطات المائلة مرة، فتُضاعف له
+        replacement_value = new_value_safe.replace('\\', '\\\\')
+        
+        # البدء بالنمط الذي طابق أثناء الاستخراج، ثم بقية الأنماط كاحتياط
+        templates = self._REPLACEMENT_TEMPLATES
+        if isinstance(pattern_used, int) and 0 <= pattern_used < len(templates):
+            order = (pattern_used,) + tuple(i for i in range(len(templates)) if i != pattern_used)
+        else:
+            order = range(len(templates))
+        
+        # محاولة الاستبدال بالأنماط المترجمة مسبقاً (مخزنة حسب القيمة الأصلية ورقم النمط)
+        for i in order:
+            pattern_template, replacement_template = templates[i]
+            key = (original_value, i)
+            compiled = self._repl_cache.get(key)
+            if compiled is None:
+                compiled = re.compile(pattern_template.format(re.escape(original_value)))
+                self._repl_cache[key] = compiled
+            
+            updated_line, count = compiled.subn(replacement_template.format(replacement_value), line)
+            if count:
+                return updated_line
         
         # استبدال مباشر كحل أخير
         if original_value in line:
@@ -790,12 +882,17 @@ class PHPFileHandler:
         
         return line
     
-    def export_translations_csv(self, output_path):
-        """تصدير الترجمات إلى ملف CSV مع معلومات إضافية"""
+    def export_translations_csv(self, output_path, compress=None):
+        """تصدير الترجمات إلى ملف CSV مع معلومات إضافية
+        
+        compress: None لملف عادي، أو 'gzip' أو 'lz4' لكتابة ملف مضغوط
+        """
         try:
             import csv
+            import io
+            from itertools import islice
             
-            with open(output_path, 'w', newline='', encoding='utf-8-sig') as csvfile:
+            with self._open_csv_output(output_path, compress) as csvfile:
                 writer = csv.writer(csvfile)
                 
                 # كتابة العناوين المحسنة
@@ -804,20 +901,32 @@ class PHPFileHandler:
                     'الحالة', 'يحتاج ترجمة', 'نوع الترجمة', 'النمط المستخدم'
                 ])
                 
-                # كتابة البيانات
-                for item in self.translations:
-                    status = determine_translation_status(item['original_value'], item['translated_value'])
-                    
-                    writer.writerow([
+                # مولّد صفوف البيانات
+                rows = (
+                    (
                         item['line_number'],
                         item['key'],
                         item['original_value'],
                         item['translated_value'],
-                        status,
-                        'نعم' if item['needs_translation'] else 'لا',
-                        item.get('translation_type', 'none'),
+                        self._item_status(i),
+                        'نعم' if needs else 'لا',
+                        translation_type,
                         item.get('pattern_used', 0)
-                    ])
+                    )
+                    for i, (item, needs, translation_type) in enumerate(zip(self.translations, self._needs_col, self._type_col))
+                )
+                
+                # تنسيق الصفوف في ذاكرة وسيطة وكتابتها على دفعات كبيرة
+                buffer = io.StringIO()
+                buffer_writer = csv.writer(buffer)
+                while True:
+                    chunk = list(islice(rows, CSV_CHUNK_ROWS))
+                    if not chunk:
+                        break
+                    buffer_writer.writerows(chunk)
+                    csvfile.write(buffer.getvalue())
+                    buffer.seek(0)
+                    buffer.truncate(0)
                     
             print(f"📊 تم تصدير {len(self.translations)} عنصر إلى CSV")
             return True
@@ -825,101 +934,197 @@ class PHPFileHandler:
         except Exception as e:
             raise Exception(f"خطأ في تصدير CSV: {str(e)}")
     
+    def _open_csv_output(self, output_path, compress):
+        """فتح ملف الإخراج النصي لتصدير CSV حسب نوع الضغط المطلوب"""
+        if compress is None:
+            return open(output_path, 'w', newline='', encoding='utf-8-sig', buffering=1 << 20)
+        
+        if compress == 'gzip':
+            import gzip
+            # مستوى ضغط منخفض: حجم أصغر بكثير مع كلفة معالجة قليلة
+            return gzip.open(output_path, 'wt', compresslevel=1, newline='', encoding='utf-8-sig')
+        
+        if compress == 'lz4':
+            try:
+                import lz4.frame
+            except ImportError:
+                raise Exception("مكتبة lz4 غير مثبتة")
+            return lz4.frame.open(output_path, 'wt', newline='', encoding='utf-8-sig')
+        
+        raise Exception(f"نوع ضغط غير مدعوم: {compress}")
+    
     def get_statistics(self):
-        """الحصول على إحصائيات مفصلة"""
-        total = len(self.translations)
-        needs_translation = len([item for item in self.translations if item['needs_translation']])
-        
-        # حساب المترجم بناءً على المحتوى العربي
-        translated = len([item for item in self.translations 
-                         if item['needs_translation'] and has_arabic_content(item['translated_value'])])
-        
-        auto_translated = len([item for item in self.translations 
-                              if item.get('translation_type') == 'auto' and has_arabic_content(item['translated_value'])])
-        
-        manual_translated = len([item for item in self.translations 
-                                if item.get('translation_type') == 'manual' and has_arabic_content(item['translated_value'])])
+        """الحصول على إحصائيات مفصلة (تُحسب عند أول طلب بعد كل تعديل)"""
+        if self._stats_cache is None:
+            self._stats_cache = self._compute_statistics()
+        return self._stats_cache
+    
+    def _adjust_statistics(self, index, was_translated, old_type, is_translated, new_type):
+        """تعديل الإحصائيات المحفوظة بعد تغيير عنصر واحد (إن كانت محسوبة)"""
+        stats = self._stats_cache
+        if stats is None:
+            return
+        
+        type_counters = {'auto': 'auto_translated', 'manual': 'manual_translated'}
+        if was_translated and old_type in type_counters:
+            stats[type_counters[old_type]] -= 1
+        if is_translated and new_type in type_counters:
+            stats[type_counters[new_type]] += 1
+        
+        if self._needs_col[index]:
+            translated = stats['translated'] + int(is_translated) - int(was_translated)
+            needs_translation = stats['needs_translation']
+            stats['translated'] = translated
+            stats['remaining'] = needs_translation - translated
+            stats['progress_percentage'] = int((translated / needs_translation) * 100) if needs_translation else 100
+    
+    def _compute_statistics(self):
+        """حساب الإحصائيات بمرور واحد على العناصر وعدادات محلية"""
+        total = needs_translation = translated = auto_translated = manual_translated = 0
+        
+        for needs, done, translation_type in zip(self._needs_col, self._translated_col, self._type_col):
+            total += 1
+            if needs:
+                needs_translation += 1
+            if done:
+                # حساب المترجم بناءً على المحتوى العربي (من الأعمدة المتوازية)
+                if needs:
+                    translated += 1
+                if translation_type == 'auto':
+                    auto_translated += 1
+                elif translation_type == 'manual':
+                    manual_translated += 1
         
         return {
             'total_items': total,
             'needs_translation': needs_translation,
             'translated': translated,
             'remaining': needs_translation - translated,
-            'progress_percentage': self.get_translation_progress(),
+            'progress_percentage': int((translated / needs_translation) * 100) if needs_translation else 100,
             'auto_translated': auto_translated,
             'manual_translated': manual_translated,
-            'has_arabic_originally': len([item for item in self.translations 
-                                        if has_arabic_content(item['original_value'])])
+            'has_arabic_originally': sum(self._get_orig_arabic_col())
         }
     
+    def _item_status(self, index):
+        """حالة ترجمة العنصر مع حفظها في عمود الحالات حتى التعديل التالي"""
+        status = self._status_col[index]
+        if status is None:
+            status = determine_translation_status(self._original_col[index], self._value_col[index])
+            self._status_col[index] = status
+        return status
+    
+    def get_item_statuses(self):
+        """حالات ترجمة كل العناصر بالترتيب (من عمود الحالات المحفوظ)"""
+        return [self._item_status(index) for index in range(len(self._translations))]
+    
     def get_translation_by_status(self, status_filter):
         """الحصول على ترجمات حسب الحالة"""
         filtered_items = []
         
-        for item in self.translations:
-            status = determine_translation_status(item['original_value'], item['translated_value'])
-            
-            if status_filter == "all" or status == status_filter:
+        if status_filter == "all":
+            return list(self.translations)
+        
+        for i, item in enumerate(self.translations):
+            if self._item_status(i) == status_filter:
                 filtered_items.append(item)
                 
         return filtered_items
     
     def find_duplicates(self):
-        """البحث عن النصوص المكررة"""
-        seen = {}
-        duplicates = []
-        
-        for item in self.translations:
-            original = item['original_value'].lower().strip()
-            if original in seen:
-                duplicates.append({
-                    'text': original,
-                    'lines': [seen[original]['line_number'], item['line_number']],
-                    'keys': [seen[original]['key'], item['key']]
-                })
-            else:
-                seen[original] = item
-                
-        return duplicates
+        """البحث عن النصوص المكررة (تُحسب عند أول طلب بعد كل تعديل)"""
+        if self._dups_cache is None:
+            self._dups_cache = self._compute_duplicates()
+        return self._dups_cache
     
-    def validate_translations(self):
-        """التحقق من صحة الترجمات"""
-        issues = []
-        
-        for i, item in enumerate(self.translations):
-            original = item['original_value']
-            translated = item['translated_value']
-            
-            # فحص الترجمات الفارغة
-            if item['needs_translation'] and not translated.strip():
-                issues.append({
-                    'type': 'empty_translation',
-                    'line': item['line_number'],
-                    'message': 'ترجمة فارغة'
-                })
-            
-            # فحص الترجمات المتطابقة مع الأصل
-            if (item['needs_translation'] and 
-                original.strip().lower() == translated.strip().lower() and
-                not has_arabic_content(translated)):
-                issues.append({
-                    'type': 'unchanged_translation',
-                    'line': item['line_number'],
-                    'message': 'لم تتغير عن النص الأصلي'
-                })
-                
-            # فحص الترجمات التي تحتوي على HTML غير متطابق
-            original_html = re.findall(r'<[^>]+>', original)
-            translated_html = re.findall(r'<[^>]+>', translated)
+    def _compute_duplicates(self):
+        """تجميع النصوص المكررة
+        
+        تُحسب بصمة رقمية واحدة لكل نص مُطبّع وتُجمع الفهارس في سلال حسب البصمة،
+        ولا تُقارن النصوص فعلياً إلا داخل السلال التي تحتوي أكثر من عنصر.
+        """
+        normalized = self._get_normalized_col()
+        signatures = None
+        
+        # المرحلة الأولى (حساب البصمات) على عدة عمليات للمجموعات الكبيرة جداً
+        ranges = self._parallel_ranges()
+        if ranges:
+            try:
+                from concurrent.futures import ProcessPoolExecutor  # استيراد عند الحاجة فقط
+                with ProcessPoolExecutor(max_workers=len(ranges)) as executor:
+                    signatures = list(chain.from_iterable(executor.map(
+                        _signature_chunk, [normalized[start:end] for start, end in ranges])))
+            except Exception as e:
+                print(f"⚠️ تعذر حساب البصمات بالتوازي، استخدام الحساب العادي: {e}")
+        
+        if signatures is None:
+            try:
+                from xxhash import xxh3_64_intdigest as signature
+            except ImportError:
+                signature = hash
+            signatures = map(signature, normalized)
+        
+        # المرحلة الثانية: تجميع الفهارس في سلال حسب البصمة
+        buckets = defaultdict(list)
+        for i, item_signature in enumerate(signatures):
+            buckets[item_signature].append(i)
+        
+        found = []
+        for indices in buckets.values():
+            if len(indices) < 2:
+                continue
             
-            if original_html != translated_html:
-                issues.append({
-                    'type': 'html_mismatch',
-                    'line': item['line_number'],
-                    'message': 'عدم تطابق في HTML tags'
-                })
-        
-        return issues
+            # مقارنة النصوص داخل السلة فقط (تحمي من تصادم البصمات)
+            seen = {}
+            for i in indices:
+                original = normalized[i]
+                if original in seen:
+                    first = self.translations[seen[original]]
+                    item = self.translations[i]
+                    found.append((i, {
+                        'text': original,
+                        'lines': [first['line_number'], item['line_number']],
+                        'keys': [first['key'], item['key']]
+                    }))
+                else:
+                    seen[original] = i
+        
+        # نفس ترتيب ظهور التكرارات في الملف
+        found.sort(key=lambda entry: entry[0])
+        return [duplicate for _, duplicate in found]
+    
+    def _parallel_ranges(self):
+        """نطاقات فهارس لكل عملية عند تجاوز حد التوازي، وإلا قائمة فارغة"""
+        total = len(self._translations)
+        workers = os.cpu_count() or 1
+        if total <= PARALLEL_ITEMS_THRESHOLD or workers < 2:
+            return []
+        
+        size = total // workers + 1
+        return [(start, min(start + size, total)) for start in range(0, total, size)]
+    
+    def validate_translations(self):
+        """التحقق من صحة الترجمات (تُحسب عند أول طلب بعد كل تعديل)"""
+        if self._issues_cache is None:
+            self._issues_cache = self._compute_validation_issues()
+        return self._issues_cache
+    
+    def _compute_validation_issues(self):
+        """فحص الترجمات وإرجاع قائمة المشاكل (على عدة عمليات للمجموعات الكبيرة جداً)"""
+        columns = (self._original_col, self._get_normalized_col(), self._value_col,
+                   self._needs_col, self._translated_col, self._line_col)
+        
+        ranges = self._parallel_ranges()
+        if ranges:
+            jobs = [tuple(column[start:end] for column in columns) for start, end in ranges]
+            try:
+                from concurrent.futures import ProcessPoolExecutor  # استيراد عند الحاجة فقط
+                with ProcessPoolExecutor(max_workers=len(jobs)) as executor:
+                    return list(chain.from_iterable(executor.map(_validate_chunk, jobs)))
+            except Exception as e:
+                print(f"⚠️ تعذر الفحص المتوازي، استخدام الفحص العادي: {e}")
+        
+        return _validate_chunk(columns)
     
     def export_project_data(self):
         """تصدير بيانات المشروع للحفظ"""
@@ -937,7 +1142,14 @@ class PHPFileHandler:
         try:
             self.file_path = Path(project_data['file_path']) if project_data.get('file_path') else None
             self.encoding = project_data.get('encoding', 'utf-8')
-            self.translations = project_data.get('translations', [])
+            translations = project_data.get('translations', [])
+            
+            # توحيد نسخ نوع الترجمة المتكررة القادمة من JSON
+            for item in translations:
+                item['translation_type'] = sys.intern(item.get('translation_type', 'none'))
+            
+            self.translations = translations
+            self._recompute_translated_flags()
             self.modified = True
             
             print(f"📂 تم استيراد مشروع يحتوي على {len(self.translations)} عنصر")
@@ -3,107 +3,498 @@
 برنامج ترجمة ملفات PHP - الواجهة الرئيسية المحدثة
 يدعم GPT-4o, GPT-4-Turbo, GPT-3.5, Gemini 2.5 Flash/Pro
 """
+import re
 import sys
+import json
 import time
 import os
+import queue
+import threading
 from pathlib import Path
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-    QTableWidget, QTableWidgetItem, QPushButton, QComboBox, QLabel,
+    QTableView, QStyledItemDelegate, QStyleOptionButton, QStyle,
+    QPushButton, QComboBox, QLabel,
     QProgressBar, QFileDialog, QMessageBox, QLineEdit, QTextEdit,
     QDialog, QFormLayout, QTabWidget, QSplitter, QHeaderView,
     QMenuBar, QStatusBar, QGroupBox, QCheckBox, QSpinBox, QMenu,
-    QAction, QInputDialog
+    QAction, QInputDialog, QProgressDialog
 )
-from PyQt5.QtCore import Qt, QThread, pyqtSignal, QTimer
-from PyQt5.QtGui import QFont, QIcon, QPixmap, QColor
+from PyQt5.QtCore import (Qt, QObject, QThread, pyqtSignal, QTimer, QRunnable, QThreadPool,
+                          QMutex, QWaitCondition, QAbstractTableModel, QModelIndex, QEvent,
+                          QSortFilterProxyModel)
+from PyQt5.QtGui import QFont, QColor
 
 # استيراد الملفات المحلية
 from config import config, SUPPORTED_MODELS
 from file_handler import PHPFileHandler
-from translators import TranslatorManager, create_translator
+from translators import TranslatorManager, GPTTranslator, create_translator
 from utils import (validate_api_key, estimate_cost, count_words, translation_cache, 
-                   check_internet_connection, save_project, load_project, 
-                   get_saved_projects, determine_translation_status, has_arabic_content)
+                   persistent_translation_cache,
+                   check_internet_connection, is_online, save_project, load_project, 
+                   get_saved_projects, determine_translation_status,
+                   group_identical_texts, rate_limiter)
+
+# أنواع استراتيجيات الترجمة الشاملة (حقل 'kind' في suggest_economy_strategy)
+STRATEGY_CURRENT = 'current_model'
+STRATEGY_MIXED = 'mixed_economy'
+STRATEGY_FULL_ECONOMY = 'full_economy'
+STRATEGY_BATCH_API = 'batch_api'
+
+# أوراق الأنماط كثوابت على مستوى الوحدة تُطبق مرة واحدة عند إنشاء النافذة والقائمة
+_MAIN_QSS = """
+    QMainWindow {
+        background-color: #f5f5f5;
+    }
+    QPushButton {
+        background-color: #007bff;
+        color: white;
+        border: none;
+        padding: 8px 16px;
+        border-radius: 4px;
+        font-weight: bold;
+        min-height: 24px;
+    }
+    QPushButton:hover {
+        background-color: #0056b3;
+    }
+    QPushButton:pressed {
+        background-color: #003d82;
+    }
+    QPushButton:disabled {
+        background-color: #6c757d;
+    }
+    QTableView {
+        background-color: white;
+        border: 1px solid #dee2e6;
+        border-radius: 4px;
+        gridline-color: #e9ecef;
+    }
+    QTableView::item {
+        padding: 8px;
+        border-bottom: 1px solid #e9ecef;
+    }
+    QTableView::item:selected {
+        background-color: #cfe2ff;
+    }
+    QHeaderView::section {
+        background-color: #f8f9fa;
+        padding: 10px;
+        border: none;
+        border-bottom: 2px solid #dee2e6;
+        font-weight: bold;
+    }
+"""
+
+_ACTION_MENU_QSS = """
+    QMenu {
+        background-color: white;
+        border: 1px solid #ccc;
+        border-radius: 4px;
+        padding: 2px;
+    }
+    QMenu::item {
+        padding: 5px 10px;
+        border-radius: 2px;
+    }
+    QMenu::item:selected {
+        background-color: #e3f2fd;
+    }
+"""
+
+# أنماط مُجمعة مسبقاً لتحسين النصوص قبل الترجمة
+_WS_RE = re.compile(r'\s+')
+_SYM_RE = re.compile(r'[^\w\s]')
+
+# حد الطلبات المتزامنة لكل مزود/نموذج (مشترك بين جميع خيوط الترجمة)
+_request_semaphores = {}
+_request_semaphores_lock = threading.Lock()
+
+def get_request_semaphore(name):
+    """الحصول على Semaphore الطلبات المتزامنة للمزود"""
+    with _request_semaphores_lock:
+        if name not in _request_semaphores:
+            limit = max(1, int(config.get_setting('parallel_workers', 4)))
+            _request_semaphores[name] = threading.Semaphore(limit)
+        return _request_semaphores[name]
+
+class TranslateBatchRunnable(QRunnable):
+    """مهمة ترجمة دفعة واحدة تُنفذ في مجمع الخيوط
+    
+    QRunnable لا يستطيع إرسال الإشارات، لذلك تُوضع النتيجة في طابور
+    يقرؤه خيط الترجمة المنسق ثم يرسل الإشارات المعتادة.
+    """
+    
+    def __init__(self, translate_func, keys, texts, results, semaphore, cancel_event):
+        super().__init__()
+        self.translate_func = translate_func
+        self.keys = keys
+        self.texts = texts
+        self.results = results
+        self.semaphore = semaphore
+        self.cancel_event = cancel_event
+        
+    def run(self):
+        translations = None
+        error = None
+        
+        if not self.cancel_event.is_set():
+            with self.semaphore:
+                try:
+                    if not self.cancel_event.is_set():
+                        translations = self.translate_func(self.texts)
+                except Exception as e:
+                    error = e
+                    
+        self.results.put((self.keys, self.texts, translations, error))
+
+def feed_translation_queue(items, items_queue, cancel_event):
+    """تغذية طابور الترجمة تدريجياً ثم وضع None كعلامة للنهاية
+    
+    الطابور محدود الحجم، فيتوقف المنتج حتى يستهلك خيط الترجمة ما سبق.
+    """
+    for item in items:
+        if not _put_unless_cancelled(items_queue, item, cancel_event):
+            return
+    _put_unless_cancelled(items_queue, None, cancel_event)
+
+def _put_unless_cancelled(items_queue, item, cancel_event):
+    while not cancel_event.is_set():
+        try:
+            items_queue.put(item, timeout=0.5)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def iter_translation_items(items, cancel_event):
+    """المرور على عناصر الترجمة سواء كانت قائمة أو طابوراً تغذيه feed_translation_queue"""
+    if not isinstance(items, queue.Queue):
+        yield from items
+        return
+        
+    while not cancel_event.is_set():
+        try:
+            item = items.get(timeout=0.5)
+        except queue.Empty:
+            continue
+        if item is None:
+            return
+        yield item
+
+class TranslationResultsBuffer:
+    """تجميع نتائج الترجمة وإرسالها كدفعات بدلاً من إشارة لكل نص
+    
+    يقلل عدد الأحداث بين الخيوط ومرات إعادة رسم الجدول.
+    """
+    
+    FLUSH_SIZE = 20
+    FLUSH_INTERVAL = 0.25  # ثانية
+    
+    def __init__(self, batch_signal, progress_signal):
+        self.batch_signal = batch_signal
+        self.progress_signal = progress_signal
+        self.pending = []
+        self.progress = None
+        self.last_flush = time.monotonic()
+        
+    def add(self, index, translated, translation_type, completed, total):
+        self.pending.append((index, translated, translation_type))
+        self.progress = (completed, total)
+        if (len(self.pending) >= self.FLUSH_SIZE or
+                time.monotonic() - self.last_flush >= self.FLUSH_INTERVAL):
+            self.flush()
+            
+    def flush(self):
+        """إرسال النتائج المتجمعة وآخر تقدم"""
+        if self.pending:
+            self.batch_signal.emit(self.pending)
+            self.pending = []
+        if self.progress is not None:
+            self.progress_signal.emit(*self.progress)
+            self.progress = None
+        self.last_flush = time.monotonic()
+
+def dispatch_batches(thread, batches, translate_func, semaphore, handle_result):
+    """توزيع الدفعات على مجمع خيوط مع إبقاء عدد محدود منها قيد التنفيذ
+    
+    batches: [(keys, texts), ...]
+    handle_result(keys, texts, translations, error) يُستدعى في الخيط المنسق
+    (translations تكون None عند الإلغاء أو الخطأ)
+    """
+    workers = max(1, int(config.get_setting('parallel_workers', 4)))
+    pool = QThreadPool()
+    pool.setMaxThreadCount(workers)
+    results = queue.Queue()
+    batches = iter(batches)
+    in_flight = 0
+    exhausted = False
+    
+    while True:
+        while not exhausted and in_flight < workers and not thread.is_cancelled:
+            batch = next(batches, None)
+            if batch is None:
+                exhausted = True
+                break
+                
+            # فحص الاتصال قبل إرسال الدفعة (الانتظار حتى عودته بدلاً من تخطي الدفعة)
+            while not thread.is_cancelled and not is_online():
+                thread.error_occurred.emit("انقطع الاتصال بالإنترنت")
+                thread.wait_for_online()
+                
+            if thread.is_cancelled:
+                break
+                
+            keys, texts = batch
+            pool.start(TranslateBatchRunnable(
+                translate_func, keys, texts, results, semaphore, thread.cancel_event
+            ))
+            in_flight += 1
+            
+        if in_flight == 0:
+            break
+            
+        try:
+            keys, texts, translations, error = results.get(timeout=TranslationResultsBuffer.FLUSH_INTERVAL)
+        except queue.Empty:
+            # لا نتائج جديدة: إرسال ما تجمع حتى لا ينتظر في المخزن
+            thread.results_buffer.flush()
+            continue
+        in_flight -= 1
+        handle_result(keys, texts, translations, error)
+        
+    pool.waitForDone()
 
 class TranslationThread(QThread):
     """خيط منفصل لتنفيذ الترجمة مع تحسينات الأداء"""
     
     progress_updated = pyqtSignal(int, int)  # current, total
-    translation_completed = pyqtSignal(int, str, str)  # index, translation, type
+    translation_batch_completed = pyqtSignal(list)  # [(index, translation, type), ...]
     error_occurred = pyqtSignal(str)
     finished_all = pyqtSignal()
     
-    def __init__(self, translator_manager, items_to_translate, translator_name):
+    def __init__(self, translator_manager, items_to_translate, translator_name, total=None):
+        """items_to_translate: قائمة [(index, text), ...] أو queue.Queue تنتهي بـ None
+        (total مطلوب مع الطابور لحساب التقدم)
+        """
         super().__init__()
         self.translator_manager = translator_manager
         self.items_to_translate = items_to_translate
         self.translator_name = translator_name
+        self.total = total if total is not None else len(items_to_translate)
         self.is_cancelled = False
+        self.cancel_event = threading.Event()
+        self._online_mutex = QMutex()
+        self._online_cond = QWaitCondition()
+        self.results_buffer = TranslationResultsBuffer(self.translation_batch_completed, self.progress_updated)
         self.batch_size = 10
         
     def run(self):
         """تنفيذ عملية الترجمة مع تحسينات"""
-        total = len(self.items_to_translate)
+        total = self.total
         completed = 0
+        already_translated = self.translator_manager.already_translated
         
         try:
-            for batch_start in range(0, total, self.batch_size):
-                if self.is_cancelled:
-                    break
-                    
-                batch_end = min(batch_start + self.batch_size, total)
-                batch = self.items_to_translate[batch_start:batch_end]
-                
-                for index, text in batch:
-                    if self.is_cancelled:
-                        break
+            # مواضع كل نص فريد ما زال بانتظار ترجمته: يُترجم مرة واحدة ثم تُوزع ترجمته عليها
+            groups = {}
+            
+            def batches():
+                # تُبنى الدفعات أثناء استهلاك العناصر، فلا تُحمل كلها في الذاكرة
+                nonlocal completed
+                keys = []
+                for index, text in iter_translation_items(self.items_to_translate, self.cancel_event):
+                    key = text.strip()
+                    if key in groups:
+                        groups[key].append((index, text))
+                        continue
                         
-                    try:
-                        # فحص الاتصال قبل الترجمة
-                        if not check_internet_connection():
-                            self.error_occurred.emit("انقطع الاتصال بالإنترنت")
-                            self.msleep(5000)  # انتظار 5 ثوان
-                            continue
-                            
-                        # تنفيذ الترجمة
-                        translated = self.translator_manager.translate(text, self.translator_name)
+                    translated = already_translated.get((self.translator_name, key))
+                    if translated is not None:
+                        completed = self._emit_group([(index, text)], translated, completed, total)
+                        continue
                         
-                        if translated and translated != text:
-                            self.translation_completed.emit(index, translated, "auto")
-                        else:
-                            self.translation_completed.emit(index, text, "auto")
-                            
-                        completed += 1
-                        self.progress_updated.emit(completed, total)
-                        self.msleep(200)
+                    groups[key] = [(index, text)]
+                    keys.append(key)
+                    if len(keys) == self.batch_size:
+                        yield keys, [groups[key][0][1] for key in keys]
+                        keys = []
                         
-                    except Exception as e:
-                        error_msg = f"خطأ في ترجمة '{text[:50]}...': {str(e)}"
-                        self.error_occurred.emit(error_msg)
-                        self.translation_completed.emit(index, text, "auto")
-                        completed += 1
-                        self.progress_updated.emit(completed, total)
-                        
-                if not self.is_cancelled and batch_end < total:
-                    self.msleep(1000)
+                if keys:
+                    yield keys, [groups[key][0][1] for key in keys]
+                
+            def handle_result(keys, texts, translations, error):
+                nonlocal completed
+                if error is not None:
+                    error_msg = f"خطأ في ترجمة الدفعة '{texts[0][:50]}...': {str(error)}"
+                    self.error_occurred.emit(error_msg)
+                    translations = texts
+                elif translations is None:
+                    return  # أُلغيت الدفعة قبل إرسالها
+                    
+                for key, text, translated in zip(keys, texts, translations):
+                    if translated and translated != text:
+                        already_translated[(self.translator_name, key)] = translated
+                    completed = self._emit_group(groups.pop(key), translated, completed, total)
+            
+            # كل دفعة تُترجم في طلب واحد، وعدة دفعات تُرسل بالتوازي
+            dispatch_batches(
+                self, batches(),
+                lambda texts: self.translator_manager.translate_batch(texts, self.translator_name),
+                get_request_semaphore(self.translator_name),
+                handle_result
+            )
                     
         except Exception as e:
             self.error_occurred.emit(f"خطأ عام في الترجمة: {str(e)}")
             
         finally:
+            self.results_buffer.flush()
             self.finished_all.emit()
         
+    def _emit_group(self, occurrences, translated, completed, total):
+        """إضافة ترجمة نص واحد لكل مواضعه إلى دفعة النتائج التالية"""
+        for index, text in occurrences:
+            completed += 1
+            result = translated if translated and translated != text else text
+            self.results_buffer.add(index, result, "auto", completed, total)
+        return completed
+        
+    def wait_for_online(self, timeout=30000):
+        """الانتظار حتى عودة الاتصال أو الإلغاء (بحد أقصى timeout ميللي ثانية)"""
+        self._online_mutex.lock()
+        try:
+            if not self.is_cancelled and not is_online():
+                self._online_cond.wait(self._online_mutex, timeout)
+        finally:
+            self._online_mutex.unlock()
+            
+    def notify_online(self):
+        """إيقاظ الخيط المنتظر عند عودة الاتصال"""
+        self._online_mutex.lock()
+        self._online_cond.wakeAll()
+        self._online_mutex.unlock()
+        
     def cancel(self):
         """إلغاء عملية الترجمة"""
         self.is_cancelled = True
+        self.cancel_event.set()
+        self.notify_online()
+
+class BatchAPITranslationThread(QThread):
+    """ترجمة النصوص عبر OpenAI Batch API (نصف التكلفة، تكتمل خلال 24 ساعة)"""
+    
+    progress_updated = pyqtSignal(int, int)  # current, total
+    translation_batch_completed = pyqtSignal(list)  # [(index, translation, type), ...]
+    error_occurred = pyqtSignal(str)
+    status_changed = pyqtSignal(str)
+    finished_all = pyqtSignal()
+    
+    POLL_INTERVAL = 30000  # فحص حالة المهمة كل 30 ثانية
+    
+    def __init__(self, translator_manager, items_to_translate, translator_name):
+        super().__init__()
+        self.translator_manager = translator_manager
+        self.items_to_translate = items_to_translate
+        self.translator_name = translator_name
+        self.is_cancelled = False
+        self._wake_mutex = QMutex()
+        self._wake_cond = QWaitCondition()
+        self.results_buffer = TranslationResultsBuffer(self.translation_batch_completed, self.progress_updated)
+        
+    def run(self):
+        total = len(self.items_to_translate)
+        completed = 0
+        already_translated = self.translator_manager.already_translated
+        translator = self.translator_manager.translators.get(self.translator_name)
+        
+        try:
+            if not isinstance(translator, GPTTranslator):
+                raise Exception("Batch API متاح لنماذج OpenAI فقط")
+                
+            # كل نص فريد يُرسل مرة واحدة، ورقمه في القائمة هو custom_id
+            groups = group_identical_texts(self.items_to_translate)
+            keys = list(groups)
+            texts = {str(n): groups[key][0][1] for n, key in enumerate(keys)}
+            requests_jsonl = "\n".join(
+                json.dumps(translator.build_batch_request(custom_id, text), ensure_ascii=False)
+                for custom_id, text in texts.items()
+            )
+            
+            job = translator.create_batch_job(requests_jsonl)
+            self.status_changed.emit(f"📤 تم إرسال {len(keys)} نص إلى Batch API")
+            
+            while job['status'] not in ('completed', 'failed', 'expired', 'cancelled'):
+                self._wait(self.POLL_INTERVAL)
+                if self.is_cancelled:
+                    translator.cancel_batch_job(job['id'])
+                    return
+                    
+                try:
+                    job = translator.get_batch_job(job['id'])
+                except Exception as e:
+                    self.error_occurred.emit(f"خطأ في فحص حالة Batch API: {str(e)}")
+                    continue
+                    
+                counts = job.get('request_counts') or {}
+                self.status_changed.emit(
+                    f"⏳ Batch API ({job['status']}): {counts.get('completed', 0)}/{counts.get('total', len(keys))}"
+                )
+                
+            if job['status'] != 'completed':
+                raise Exception(f"انتهت مهمة Batch API بالحالة: {job['status']}")
+                
+            results = {}
+            if job.get('output_file_id'):
+                results = translator.get_batch_results(job['output_file_id'], texts)
+                
+            for custom_id, key in enumerate(keys):
+                occurrences = groups[key]
+                translated = results.get(str(custom_id))
+                if translated and translated != occurrences[0][1]:
+                    already_translated[(self.translator_name, key)] = translated
+                    
+                for index, text in occurrences:
+                    completed += 1
+                    self.results_buffer.add(index, translated or text, "auto", completed, total)
+                    
+        except Exception as e:
+            self.error_occurred.emit(f"خطأ في ترجمة Batch API: {str(e)}")
+            
+        finally:
+            self.results_buffer.flush()
+            self.finished_all.emit()
+            
+    def _wait(self, timeout):
+        """انتظار قابل للمقاطعة عند الإلغاء أو عودة الاتصال"""
+        self._wake_mutex.lock()
+        try:
+            if not self.is_cancelled:
+                self._wake_cond.wait(self._wake_mutex, timeout)
+        finally:
+            self._wake_mutex.unlock()
+            
+    def notify_online(self):
+        """فحص حالة المهمة فوراً عند عودة الاتصال"""
+        self._wake_mutex.lock()
+        self._wake_cond.wakeAll()
+        self._wake_mutex.unlock()
+        
+    def cancel(self):
+        """إلغاء المهمة"""
+        self.is_cancelled = True
+        self.notify_online()
 
 class CostAnalysisDialog(QDialog):
     """نافذة تحليل التكلفة واختيار الاستراتيجية"""
     
-    def __init__(self, untranslated_items, current_model, strategies, parent=None):
+    def __init__(self, untranslated_items, current_model, strategies, parent=None, total_words=None):
         super().__init__(parent)
         self.untranslated_items = untranslated_items
+        # إجمالي الكلمات يُمرر من النافذة الرئيسية إن كان محسوباً، وإلا يُحسب مرة واحدة هنا
+        if total_words is None:
+            total_words = sum(words for _, _, words in untranslated_items)
+        self.total_words = total_words
         self.current_model = current_model
         self.strategies = strategies
         self.selected_strategy = None
@@ -120,11 +511,8 @@ class CostAnalysisDialog(QDialog):
         info_group = QGroupBox("معلومات الترجمة")
         info_layout = QFormLayout()
         
-        total_items = len(self.untranslated_items)
-        total_words = sum(words for _, _, words in self.untranslated_items)
-        
-        info_layout.addRow("عدد النصوص:", QLabel(f"{total_items:,}"))
-        info_layout.addRow("إجمالي الكلمات:", QLabel(f"{total_words:,}"))
+        info_layout.addRow("عدد النصوص:", QLabel(f"{len(self.untranslated_items):,}"))
+        info_layout.addRow("إجمالي الكلمات:", QLabel(f"{self.total_words:,}"))
         info_layout.addRow("النموذج الحالي:", QLabel(self.current_model))
         
         info_group.setLayout(info_layout)
@@ -140,9 +528,19 @@ class CostAnalysisDialog(QDialog):
         from PyQt5.QtWidgets import QRadioButton, QButtonGroup
         self.button_group = QButtonGroup()
         
+        # حساب أقل وأعلى تكلفة مرة واحدة بدلاً من كل تكرار
+        costs = [s['cost'] for s in self.strategies.values()]
+        min_cost = min(costs)
+        max_cost = max(costs)
+        # الاختيار الافتراضي لا يشمل مهام الخلفية الطويلة (Batch API)
+        default_cost = min(s['cost'] for s in self.strategies.values() if not s.get('background'))
+        # تنسيق التكلفة مرة واحدة لكل استراتيجية (يُعاد استخدامه في نافذة التفاصيل)
+        self.cost_strings = {key: f"${s['cost']:.4f}" for key, s in self.strategies.items()}
+        
         for key, strategy in self.strategies.items():
+            cost_str = self.cost_strings[key]
             radio = QRadioButton()
-            radio.setText(f"{strategy['name']} - ${strategy['cost']:.4f}")
+            radio.setText(f"{strategy['name']} - {cost_str}")
             radio.setToolTip(strategy['description'])
             
             # إضافة وصف مفصل
@@ -150,10 +548,10 @@ class CostAnalysisDialog(QDialog):
             desc_label.setStyleSheet("color: #666; font-size: 11px; margin-left: 20px;")
             
             # تلوين حسب التكلفة
-            if strategy['cost'] == min(s['cost'] for s in self.strategies.values()):
+            if strategy['cost'] == min_cost:
                 radio.setStyleSheet("color: #28a745; font-weight: bold;")  # الأرخص
                 desc_label.setText(f"   💚 {strategy['description']} - الأرخص!")
-            elif strategy['cost'] == max(s['cost'] for s in self.strategies.values()):
+            elif strategy['cost'] == max_cost:
                 radio.setStyleSheet("color: #dc3545;")  # الأغلى
             else:
                 radio.setStyleSheet("color: #ffc107;")  # متوسط
@@ -165,7 +563,7 @@ class CostAnalysisDialog(QDialog):
             radio.setProperty('strategy_key', key)
             
             # تحديد الاستراتيجية الاقتصادية افتراضياً
-            if strategy['cost'] == min(s['cost'] for s in self.strategies.values()):
+            if strategy['cost'] == default_cost and self.selected_strategy is None:
                 radio.setChecked(True)
                 self.selected_strategy = strategy
         
@@ -174,8 +572,6 @@ class CostAnalysisDialog(QDialog):
         
         # إحصائيات التوفير
         savings_label = QLabel()
-        max_cost = max(s['cost'] for s in self.strategies.values())
-        min_cost = min(s['cost'] for s in self.strategies.values())
         potential_savings = max_cost - min_cost
         
         if potential_savings > 0:
@@ -224,9 +620,9 @@ class CostAnalysisDialog(QDialog):
         """عرض تفاصيل التكلفة"""
         details_text = "📊 تفاصيل التكلفة لكل استراتيجية:\n\n"
         
-        for strategy in self.strategies.values():
+        for key, strategy in self.strategies.items():
             details_text += f"🔹 {strategy['name']}\n"
-            details_text += f"   التكلفة: ${strategy['cost']:.4f}\n"
+            details_text += f"   التكلفة: {self.cost_strings[key]}\n"
             details_text += f"   الوصف: {strategy['description']}\n\n"
         
         QMessageBox.information(self, "تفاصيل التكلفة", details_text)
@@ -236,7 +632,7 @@ class SmartTranslationThread(QThread):
     """خيط ترجمة ذكي مع تحسين التكلفة"""
     
     progress_updated = pyqtSignal(int, int)
-    translation_completed = pyqtSignal(int, str, str)
+    translation_batch_completed = pyqtSignal(list)
     error_occurred = pyqtSignal(str)
     finished_all = pyqtSignal()
     cost_saved = pyqtSignal(float, str)
@@ -246,11 +642,18 @@ class SmartTranslationThread(QThread):
         self.translator_manager = translator_manager
         self.translation_queue = translation_queue  # [(index, text, model), ...]
         self.is_cancelled = False
+        self.cancel_event = threading.Event()
+        self._online_mutex = QMutex()
+        self._online_cond = QWaitCondition()
+        self.results_buffer = TranslationResultsBuffer(self.translation_batch_completed, self.progress_updated)
         self.total_cost_saved = 0.0
+        self.cost_lock = threading.Lock()
+        self.batch_size = 100  # أقصى عدد نصوص في طلب دفعي واحد
         
     def run(self):
         total = len(self.translation_queue)
         completed = 0
+        already_translated = self.translator_manager.already_translated
         
         # تجميع النصوص حسب النموذج للمعالجة الدفعية
         model_groups = {}
@@ -264,40 +667,50 @@ class SmartTranslationThread(QThread):
                 if self.is_cancelled:
                     break
                     
-                print(f"🤖 معالجة {len(items)} نص باستخدام {model}")
+                # كل نص فريد يُترجم مرة واحدة ثم تُوزع ترجمته على كل مواضعه
+                groups = group_identical_texts(items)
+                print(f"🤖 معالجة {len(items)} نص ({len(groups)} نص فريد) باستخدام {model}")
                 
-                for index, text in items:
-                    if self.is_cancelled:
-                        break
+                # الموجود في الذاكرة يُرسل فوراً، والباقي يُجمع لطلبات دفعية
+                misses = []
+                for key, occurrences in groups.items():
+                    translated = already_translated.get((model, key))
+                    if translated is None:
+                        translated = self.get_cached_translation(occurrences[0][1], model)
+                    if translated is not None:
+                        completed = self._emit_group(occurrences, translated, completed, total)
+                    else:
+                        misses.append(key)
                         
-                    try:
-                        # فحص الاتصال
-                        if not check_internet_connection():
-                            self.error_occurred.emit("انقطع الاتصال بالإنترنت")
-                            self.msleep(5000)
-                            continue
+                batches = []
+                for batch_start in range(0, len(misses), self.batch_size):
+                    keys = misses[batch_start:batch_start + self.batch_size]
+                    batches.append((keys, [groups[key][0][1] for key in keys]))
                         
-                        # الترجمة الذكية مع Cache
-                        translated = self.smart_translate(text, model)
+                def translate_chunk(texts, model=model):
+                    # تحسين النصوص ثم ترجمتها في طلب واحد، والانتظار فقط إذا نفدت حصة النموذج
+                    optimized = [self.optimize_text_for_translation(text) for text in texts]
+                    estimated_tokens = sum(map(count_words, optimized)) * 1.3
+                    rate_limiter.wait_for(model, estimated_tokens)
+                    return self.translator_manager.translate_batch(optimized, model)
+                    
+                def handle_result(keys, texts, translations, error, model=model, groups=groups):
+                    nonlocal completed
+                    if error is not None:
+                        error_msg = f"خطأ في ترجمة الدفعة '{texts[0][:30]}...': {str(error)}"
+                        self.error_occurred.emit(error_msg)
+                        translations = texts
+                    elif translations is None:
+                        return  # أُلغيت الدفعة قبل إرسالها
                         
+                    for key, text, translated in zip(keys, texts, translations):
                         if translated and translated != text:
-                            self.translation_completed.emit(index, translated, "smart")
-                        else:
-                            self.translation_completed.emit(index, text, "smart")
-                            
-                        completed += 1
-                        self.progress_updated.emit(completed, total)
-                        
-                        # توقف متكيف حسب النموذج
-                        delay = self.get_model_delay(model)
-                        self.msleep(delay)
-                        
-                    except Exception as e:
-                        error_msg = f"خطأ في ترجمة '{text[:30]}...': {str(e)}"
-                        self.error_occurred.emit(error_msg)
-                        self.translation_completed.emit(index, text, "smart")
-                        completed += 1
-                        self.progress_updated.emit(completed, total)
+                            already_translated[(model, key)] = translated
+                            persistent_translation_cache.set(text, translated, model)
+                            self.track_cost_saved(text, model)
+                        completed = self._emit_group(groups[key], translated, completed, total)
+                    
+                dispatch_batches(self, batches, translate_chunk, get_request_semaphore(model), handle_result)
                 
                 # توقف بين النماذج
                 if not self.is_cancelled and len(model_groups) > 1:
@@ -307,56 +720,69 @@ class SmartTranslationThread(QThread):
             self.error_occurred.emit(f"خطأ عام في الترجمة الذكية: {str(e)}")
             
         finally:
+            self.results_buffer.flush()
             if self.total_cost_saved > 0:
                 self.cost_saved.emit(self.total_cost_saved, "تم توفير التكلفة!")
             self.finished_all.emit()
     
-    def smart_translate(self, text, model):
-        """ترجمة ذكية مع تحسين"""
-        # البحث في Cache أولاً
-        from utils import translation_cache
+    def _emit_group(self, occurrences, translated, completed, total):
+        """إضافة ترجمة نص واحد لكل مواضعه إلى دفعة النتائج التالية"""
+        for index, text in occurrences:
+            completed += 1
+            result = translated if translated and translated != text else text
+            self.results_buffer.add(index, result, "smart", completed, total)
+        return completed
+    
+    def get_cached_translation(self, text, model):
+        """البحث عن ترجمة محفوظة في Cache ثم في الذاكرة الدائمة"""
         cached = translation_cache.get(text)
         if cached:
             return cached
             
-        # تحسين النص قبل الإرسال
-        optimized_text = self.optimize_text_for_translation(text)
+        # الذاكرة الدائمة على القرص (تبقى بين الجلسات)
+        return persistent_translation_cache.get(text, model)
         
-        # الترجمة
-        translated = self.translator_manager.translate(optimized_text, model)
-        
-        # حساب التوفير
-        original_cost = estimate_cost(count_words(text), 'gpt-4o')  # أغلى نموذج
-        actual_cost = estimate_cost(count_words(text), model)
-        self.total_cost_saved += (original_cost - actual_cost)
-        
-        return translated
+    def track_cost_saved(self, text, model):
+        """إضافة التوفير مقارنة بأغلى نموذج لنص تمت ترجمته"""
+        words = count_words(text)
+        original_cost = estimate_cost(words, 'gpt-4o')  # أغلى نموذج
+        actual_cost = estimate_cost(words, model)
+        with self.cost_lock:
+            self.total_cost_saved += (original_cost - actual_cost)
     
     def optimize_text_for_translation(self, text):
         """تحسين النص لتقليل التكلفة"""
         # إزالة المسافات الزائدة
-        optimized = re.sub(r'\s+', ' ', text.strip())
+        optimized = _WS_RE.sub(' ', text.strip())
+        if not optimized:
+            return optimized
         
-        # تجنب ترجمة النصوص التي تحتوي على رموز برمجية كثيرة
-        symbol_ratio = len(re.findall(r'[^\w\s]', optimized)) / len(optimized) if optimized else 0
-        if symbol_ratio > 0.5:
+        # تجنب ترجمة النصوص التي تحتوي على رموز برمجية كثيرة (نسبة الرموز > 50%)
+        symbol_count = sum(1 for _ in _SYM_RE.finditer(optimized))
+        if symbol_count * 2 > len(optimized):
             return optimized[:50]  # تقصير النصوص المليئة بالرموز
             
         return optimized
     
-    def get_model_delay(self, model):
-        """الحصول على التأخير المناسب للنموذج"""
-        delays = {
-            'gpt-3.5-turbo': 300,      # 300ms
-            'gemini-2.5-flash': 200,   # 200ms  
-            'gemini-2.5-pro': 500,     # 500ms
-            'gpt-4-turbo': 800,        # 800ms
-            'gpt-4o': 1000             # 1s
-        }
-        return delays.get(model, 500)
-    
+    def wait_for_online(self, timeout=30000):
+        """الانتظار حتى عودة الاتصال أو الإلغاء (بحد أقصى timeout ميللي ثانية)"""
+        self._online_mutex.lock()
+        try:
+            if not self.is_cancelled and not is_online():
+                self._online_cond.wait(self._online_mutex, timeout)
+        finally:
+            self._online_mutex.unlock()
+            
+    def notify_online(self):
+        """إيقاظ الخيط المنتظر عند عودة الاتصال"""
+        self._online_mutex.lock()
+        self._online_cond.wakeAll()
+        self._online_mutex.unlock()
+        
     def cancel(self):
         self.is_cancelled = True
+        self.cancel_event.set()
+        self.notify_online()
 
 
 class MultiTranslationDialog(QDialog):
@@ -399,6 +825,77 @@ class MultiTranslationDialog(QDialog):
     def select_translation(self, translation):
         self.selected_translation = translation
 
+class APITestSignals(QObject):
+    """إشارات نتيجة اختبار مفتاح API (QRunnable لا يملك إشارات)"""
+    success = pyqtSignal(str)  # الترجمة الناتجة
+    failure = pyqtSignal(str)  # رسالة الخطأ، فارغة إذا لم تصل ترجمة صالحة
+
+class APITestRunnable(QRunnable):
+    """اختبار مفتاح API في خيط من المجمع العام دون حجب الواجهة"""
+    
+    def __init__(self, provider, api_key):
+        super().__init__()
+        self.provider = provider
+        self.api_key = api_key
+        # يُنشأ في الخيط الرئيسي لتصل الإشارات إلى الواجهة عبر الطابور
+        self.signals = APITestSignals()
+        
+    def run(self):
+        try:
+            if self.provider == 'openai':
+                translator = create_translator('openai', self.api_key, 'gpt-3.5-turbo')
+            else:
+                translator = create_translator('google', self.api_key, 'gemini-2.5-flash')
+                
+            test_text = "test"
+            result = translator.translate(test_text)
+            
+            if result and result.strip() and result.lower() != test_text.lower():
+                self.signals.success.emit(result)
+            else:
+                self.signals.failure.emit("")
+                
+        except Exception as e:
+            self.signals.failure.emit(str(e))
+
+class SaveFileSignals(QObject):
+    """إشارات نتيجة الحفظ في الخلفية"""
+    saved = pyqtSignal()
+    failed = pyqtSignal(str)
+
+class SaveFileRunnable(QRunnable):
+    """حفظ ملف PHP في خيط من مجمع الحفظ حتى لا تتجمد الواجهة
+    
+    يكتب نسخة حفظ أُخذت في خيط الواجهة ولا يقرأ من معالج الملفات نفسه
+    """
+    
+    def __init__(self, snapshot, create_backup):
+        super().__init__()
+        self.snapshot = snapshot
+        self.create_backup = create_backup
+        self.signals = SaveFileSignals()
+        
+    def run(self):
+        try:
+            self.snapshot.write(self.create_backup)
+            self.signals.saved.emit()
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+
+class ConnectionCheckSignals(QObject):
+    """إشارة نتيجة فحص الاتصال"""
+    checked = pyqtSignal(bool)
+
+class ConnectionCheckRunnable(QRunnable):
+    """فحص الاتصال بالإنترنت خارج خيط الواجهة (قد يستغرق حتى مهلة الطلب)"""
+    
+    def __init__(self):
+        super().__init__()
+        self.signals = ConnectionCheckSignals()
+        
+    def run(self):
+        self.signals.checked.emit(check_internet_connection())
+
 class SettingsDialog(QDialog):
     """نافذة الإعدادات المحدثة"""
     
@@ -407,6 +904,7 @@ class SettingsDialog(QDialog):
         self.setWindowTitle("إعدادات البرنامج")
         self.setFixedSize(600, 500)
         self.setLayoutDirection(Qt.RightToLeft)
+        self.api_test_runnables = {}
         self.setup_ui()
         self.load_settings()
         
@@ -533,42 +1031,278 @@ class SettingsDialog(QDialog):
             
         button.setEnabled(False)
         button.setText("جارٍ الاختبار...")
-        QApplication.processEvents()
         
-        try:
-            if provider == 'openai':
-                translator = create_translator('openai', api_key, 'gpt-3.5-turbo')
-            elif provider == 'google':
-                translator = create_translator('google', api_key, 'gemini-2.5-flash')
-            
-            test_text = "test"
-            result = translator.translate(test_text)
-            
-            if result and result.strip() and result.lower() != test_text.lower():
-                QMessageBox.information(self, f"✅ نجح {provider}", 
-                                      f"تم اختبار {provider} بنجاح!\nالترجمة: {result}")
-                button.setText(f"✅ نجح")
-                button.setStyleSheet("background-color: #28a745;")
-            else:
-                QMessageBox.warning(self, f"❌ فشل {provider}", 
-                                  f"فشل في اختبار {provider}!")
-                button.setText(f"❌ فشل")
-                button.setStyleSheet("background-color: #dc3545;")
-                
-        except Exception as e:
-            QMessageBox.critical(self, f"❌ خطأ {provider}", f"فشل اختبار {provider}:\n{str(e)}")
-            button.setText(f"❌ فشل")
-            button.setStyleSheet("background-color: #dc3545;")
-            
-        finally:
-            button.setEnabled(True)
-            QTimer.singleShot(3000, lambda: self.reset_test_button(button, provider))
-            
+        # تشغيل الاختبار في الخلفية والرد عبر الإشارات
+        runnable = APITestRunnable(provider, api_key)
+        runnable.signals.success.connect(lambda result: self.on_api_test_success(button, provider, result))
+        runnable.signals.failure.connect(lambda error: self.on_api_test_failure(button, provider, error))
+        runnable.setAutoDelete(False)
+        self.api_test_runnables[provider] = runnable  # الاحتفاظ بمرجع حتى انتهاء الاختبار
+        QThreadPool.globalInstance().start(runnable)
+        
+    def on_api_test_success(self, button, provider, result):
+        """عند نجاح اختبار مفتاح API"""
+        self.api_test_runnables.pop(provider, None)
+        QMessageBox.information(self, f"✅ نجح {provider}", 
+                              f"تم اختبار {provider} بنجاح!\nالترجمة: {result}")
+        button.setText(f"✅ نجح")
+        button.setStyleSheet("background-color: #28a745;")
+        button.setEnabled(True)
+        QTimer.singleShot(3000, lambda: self.reset_test_button(button, provider))
+        
+    def on_api_test_failure(self, button, provider, error):
+        """عند فشل اختبار مفتاح API"""
+        self.api_test_runnables.pop(provider, None)
+        if error:
+            QMessageBox.critical(self, f"❌ خطأ {provider}", f"فشل اختبار {provider}:\n{error}")
+        else:
+            QMessageBox.warning(self, f"❌ فشل {provider}", 
+                              f"فشل في اختبار {provider}!")
+        button.setText(f"❌ فشل")
+        button.setStyleSheet("background-color: #dc3545;")
+        button.setEnabled(True)
+        QTimer.singleShot(3000, lambda: self.reset_test_button(button, provider))
+        
     def reset_test_button(self, button, provider):
         """إعادة تعيين زر الاختبار"""
         button.setText(f"اختبار {provider}")
         button.setStyleSheet("")
 
+class TranslationTableModel(QAbstractTableModel):
+    """نموذج بيانات الجدول الرئيسي (قوائم متوازية بدلاً من عنصر لكل خلية)
+    
+    يُرسم فقط ما يظهر على الشاشة، لذلك يبقى الجدول سريعاً مع عشرات الآلاف من الصفوف.
+    """
+    
+    # الحالة تُخزن كرقم صغير بدلاً من النص
+    STATUS_TRANSLATED = 0
+    STATUS_UNTRANSLATED = 1
+    STATUS_NO_NEED = 2
+    STATUS_LABELS = ("مترجم", "غير مترجم", "لا يحتاج ترجمة")
+    STATUS_CODES = {label: code for code, label in enumerate(STATUS_LABELS)}
+    
+    HEADERS = ("النص الأصلي", "الترجمة", "الحالة", "إجراءات")
+    MAX_DISPLAY_LENGTH = 200
+    
+    # ألوان الصفوف حسب الحالة ونوع الترجمة
+    TRANSLATED_COLORS = {
+        "auto": QColor(200, 255, 200),  # أخضر فاتح للترجمة التلقائية
+        "manual": QColor(255, 255, 200),  # أصفر فاتح للترجمة اليدوية
+        "none": QColor(255, 255, 255)   # أبيض
+    }
+    STATUS_COLORS = (
+        None,
+        QColor(255, 200, 200),  # أحمر فاتح - غير مترجم
+        QColor(220, 220, 220)   # رمادي فاتح - لا يحتاج ترجمة
+    )
+    
+    # (الصف، الترجمة الجديدة) عند التحرير اليدوي في الجدول
+    translation_edited = pyqtSignal(int, str)
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.originals = []
+        self.translations = []
+        self.statuses = []
+        self.types = []
+        self.actionable = []  # هل يظهر زر الإجراءات للصف
+        # نسخ بأحرف صغيرة للبحث، تُبنى عند أول بحث وتُحدّث مع كل ترجمة
+        self.originals_lower = None
+        self.translations_lower = None
+        self.generation = 0  # يزيد مع كل تحميل لتعرف التصفية أن نتائجها قديمة
+        
+    def load(self, items, statuses=None):
+        """تحميل عناصر الترجمة من معالج الملفات
+        
+        statuses: حالات العناصر المحفوظة مسبقاً (من get_item_statuses) لتجنب إعادة حسابها
+        """
+        self.beginResetModel()
+        self.originals = [item['original_value'] for item in items]
+        self.translations = [item['translated_value'] for item in items]
+        if statuses is None:
+            statuses = map(determine_translation_status, self.originals, self.translations)
+        self.statuses = [self.STATUS_CODES[status] for status in statuses]
+        self.types = [item.get('translation_type', 'none') for item in items]
+        # is_translated يساوي وجود العربي في الترجمة ويُحدّث مع كل تعديل
+        self.actionable = [
+            item['needs_translation'] or not item['is_translated']
+            for item in items
+        ]
+        # إعادة بناء أعمدة البحث إن كانت مستخدمة (قد يبقى فلتر بحث فعالاً بعد إعادة التحميل)
+        searching = self.originals_lower is not None
+        self.originals_lower = None
+        self.translations_lower = None
+        self.generation += 1
+        if searching:
+            self.ensure_search_columns()
+        self.endResetModel()
+        
+    def ensure_search_columns(self):
+        """بناء عمودي النصوص بأحرف صغيرة مرة واحدة لكل تحميل"""
+        if self.originals_lower is None:
+            self.originals_lower = [text.lower() for text in self.originals]
+            self.translations_lower = [text.lower() for text in self.translations]
+            
+    def search_mask(self, needle):
+        """علامة لكل صف يحتوي أصله أو ترجمته على needle (بأحرف صغيرة)
+        
+        تُحسب مرة واحدة لكل نص بحث في مرور واحد على العمودين، فيكتفي
+        filterAcceptsRow بقراءة علامة الصف بدل البحث في النصوص.
+        """
+        self.ensure_search_columns()
+        return bytearray(
+            needle in original or needle in translation
+            for original, translation in zip(self.originals_lower, self.translations_lower)
+        )
+        
+    def set_translation(self, row, translated_text, translation_type, notify=True):
+        """تحديث ترجمة صف واحد وإعادة رسمه فقط"""
+        self.translations[row] = translated_text
+        self.statuses[row] = self.STATUS_CODES[
+            determine_translation_status(self.originals[row], translated_text)
+        ]
+        self.types[row] = translation_type
+        if self.translations_lower is not None:
+            self.translations_lower[row] = translated_text.lower()
+        if notify:
+            self.notify_rows_changed(row, row)
+            
+    def notify_rows_changed(self, first_row, last_row):
+        """إعادة رسم نطاق من الصفوف بإشارة dataChanged واحدة"""
+        self.dataChanged.emit(self.index(first_row, 0), self.index(last_row, len(self.HEADERS) - 1))
+        
+    def status_label(self, row):
+        return self.STATUS_LABELS[self.statuses[row]]
+        
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.originals)
+        
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+        
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
+        
+    def flags(self, index):
+        flags = Qt.ItemIsSelectable | Qt.ItemIsEnabled
+        if index.column() == 1:
+            flags |= Qt.ItemIsEditable
+        return flags
+        
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+            
+        row = index.row()
+        column = index.column()
+        
+        if role == Qt.DisplayRole:
+            if column == 0:
+                return self._display_text(self.originals[row])
+            if column == 1:
+                return self._display_text(self.translations[row])
+            if column == 2:
+                return self.STATUS_LABELS[self.statuses[row]]
+            return "ترجمة ▾" if self.actionable[row] else "-"
+            
+        if role == Qt.EditRole and column == 1:
+            return self.translations[row]
+            
+        if role == Qt.ToolTipRole and column < 2:
+            # النص كامل في tooltip فقط إذا كان مقطوعاً في الخلية
+            text = self.originals[row] if column == 0 else self.translations[row]
+            return text if len(text) > self.MAX_DISPLAY_LENGTH else None
+            
+        if role == Qt.BackgroundRole:
+            status = self.statuses[row]
+            if status == self.STATUS_TRANSLATED:
+                return self.TRANSLATED_COLORS.get(self.types[row], self.TRANSLATED_COLORS["auto"])
+            return self.STATUS_COLORS[status]
+            
+        if role == Qt.UserRole and column == 3:
+            return self.actionable[row]
+            
+        return None
+        
+    def setData(self, index, value, role=Qt.EditRole):
+        """التحرير اليدوي لعمود الترجمة"""
+        if role != Qt.EditRole or index.column() != 1:
+            return False
+            
+        row = index.row()
+        if value == self.translations[row]:
+            return False
+            
+        self.set_translation(row, value, "manual")
+        self.translation_edited.emit(row, value)
+        return True
+        
+    def _display_text(self, text):
+        """تقصير النص المعروض للأداء"""
+        if len(text) <= self.MAX_DISPLAY_LENGTH:
+            return text
+        return text[:self.MAX_DISPLAY_LENGTH] + "..."
+
+class TranslationFilterProxyModel(QSortFilterProxyModel):
+    """تصفية صفوف الجدول حسب نص البحث والحالة دون المرور على الجدول في كل مرة"""
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.search_text = ""
+        self.search_mask = None
+        self.mask_generation = None
+        self.wanted_status = None
+        # الفلتر يُطبق عند طلبه فقط، فلا تختفي الصفوف أثناء الترجمة
+        self.setDynamicSortFilter(False)
+        
+    def set_filter(self, search_text, wanted_status):
+        self.search_text = search_text
+        self.wanted_status = wanted_status
+        self.search_mask = None
+        self.invalidateFilter()
+        
+    def filterAcceptsRow(self, source_row, source_parent):
+        model = self.sourceModel()
+        
+        # فلتر الحالة
+        if self.wanted_status is not None and model.statuses[source_row] != self.wanted_status:
+            return False
+            
+        # فلتر النص (البحث في النص الأصلي والترجمة): تُحسب نتائج كل الصفوف مرة واحدة
+        # لكل تصفية أو تحميل جديد ثم يُقرأ منها
+        if self.search_text:
+            if self.search_mask is None or self.mask_generation != model.generation:
+                self.search_mask = model.search_mask(self.search_text)
+                self.mask_generation = model.generation
+            return bool(self.search_mask[source_row])
+        return True
+
+class ActionButtonDelegate(QStyledItemDelegate):
+    """رسم زر الإجراءات في الجدول دون إنشاء ويدجت لكل صف"""
+    
+    def __init__(self, on_clicked, parent=None):
+        super().__init__(parent)
+        self.on_clicked = on_clicked  # on_clicked(index, global_pos)
+        
+    def paint(self, painter, option, index):
+        if not index.data(Qt.UserRole):
+            super().paint(painter, option, index)
+            return
+            
+        button = QStyleOptionButton()
+        button.rect = option.rect.adjusted(4, 4, -4, -4)
+        button.text = index.data(Qt.DisplayRole)
+        button.state = QStyle.State_Enabled
+        QApplication.style().drawControl(QStyle.CE_PushButton, button, painter)
+        
+    def editorEvent(self, event, model, option, index):
+        if event.type() == QEvent.MouseButtonRelease and index.data(Qt.UserRole):
+            self.on_clicked(index, event.globalPos())
+            return True
+        return super().editorEvent(event, model, option, index)
+
 class MainWindow(QMainWindow):
     """النافذة الرئيسية للبرنامج المحدثة"""
     
@@ -579,6 +1313,14 @@ class MainWindow(QMainWindow):
         self.translation_thread = None
         self.auto_save_timer = QTimer()
         self.connection_check_timer = QTimer()
+        self.cache_flush_timer = QTimer()
+        # الحفظ التلقائي والطارئ في الخلفية (خيط واحد فلا تتداخل عمليتا حفظ)
+        self.save_pool = QThreadPool()
+        self.save_pool.setMaxThreadCount(1)
+        self.save_runnable = None
+        self.connection_check_runnable = None
+        self.stats_update_pending = False
+        self.last_connection_state = None  # آخر حالة معروضة، لتحديث العنوان عند التغير فقط
         self.last_connection_time = time.time()
         self.project_name = None
         
@@ -586,6 +1328,7 @@ class MainWindow(QMainWindow):
         self.setup_translators()
         self.setup_auto_save()
         self.setup_connection_monitor()
+        self.setup_cache_flush()
         
     def setup_ui(self):
         """إعداد واجهة المستخدم المحدثة"""
@@ -613,6 +1356,9 @@ class MainWindow(QMainWindow):
         self.model_label = QLabel("النموذج:")
         self.model_combo = QComboBox()
         self.model_combo.addItem("اختر النموذج...")
+        # النموذج المختار يُحفظ عند التغيير بدلاً من قراءة القائمة مع كل ترجمة
+        self.current_model = None
+        self.model_combo.currentIndexChanged.connect(self.on_model_changed)
         
         # أزرار الترجمة
         self.translate_all_btn = QPushButton("🌐 ترجمة الكل")
@@ -660,11 +1406,19 @@ class MainWindow(QMainWindow):
         main_layout.addLayout(search_layout)
         
         # الجدول الرئيسي - بدون عمود المفتاح
-        self.table = QTableWidget()
-        self.table.setColumnCount(4)  # إزالة عمود المفتاح
-        self.table.setHorizontalHeaderLabels([
-            "النص الأصلي", "الترجمة", "الحالة", "إجراءات"
-        ])
+        self.table_model = TranslationTableModel(self)
+        self.table_proxy = TranslationFilterProxyModel(self)
+        self.table_proxy.setSourceModel(self.table_model)
+        self.table = QTableView()
+        self.table.setModel(self.table_proxy)
+        self.actions_delegate = ActionButtonDelegate(
+            lambda index, pos: self.show_row_actions_menu(self.table_proxy.mapToSource(index).row(), pos),
+            self.table
+        )
+        self.table.setItemDelegateForColumn(3, self.actions_delegate)
+        # قائمة إجراءات واحدة مشتركة بين كل الصفوف
+        self.menu_row = None
+        self.row_actions_menu = self.create_row_actions_menu()
         
         # تنسيق الجدول مع تحكم في الأعمدة
         header = self.table.horizontalHeader()
@@ -687,9 +1441,9 @@ class MainWindow(QMainWindow):
         self.table.setColumnWidth(3, column_widths['actions'])
         
         self.table.setAlternatingRowColors(True)
-        self.table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.table.setSelectionBehavior(QTableView.SelectRows)
         # تحسين ارتفاع الصفوف
-        self.table.verticalHeader().setDefaultSectionSize(40)
+        self.table.verticalHeader().setDefaultSectionSize(50)
         
         main_layout.addWidget(self.table)
         
@@ -726,9 +1480,13 @@ class MainWindow(QMainWindow):
         self.translate_all_btn.clicked.connect(self.translate_all)
         self.translate_selected_btn.clicked.connect(self.translate_selected)
         self.stop_btn.clicked.connect(self.stop_translation)
-        self.search_input.textChanged.connect(self.filter_table)
-        self.filter_combo.currentTextChanged.connect(self.filter_table)
-        self.table.cellChanged.connect(self.on_cell_changed)
+        # التصفية مرة واحدة بعد توقف الكتابة بدلاً من كل حرف
+        self._filter_timer = QTimer()
+        self._filter_timer.setSingleShot(True)
+        self._filter_timer.timeout.connect(self.filter_table)
+        self.search_input.textChanged.connect(lambda _: self._filter_timer.start(150))
+        self.filter_combo.currentTextChanged.connect(lambda _: self._filter_timer.start(150))
+        self.table_model.translation_edited.connect(self.on_translation_edited)
         
         self.apply_styles()
         
@@ -770,16 +1528,19 @@ class MainWindow(QMainWindow):
         self.refresh_translators()
         
     def refresh_translators(self):
-        """تحديث المترجمات المتاحة"""
-        self.translator_manager = TranslatorManager()
+        """تحديث المترجمات المتاحة
+        
+        يُحتفظ بنفس المدير والمترجمات ما لم يتغير المفتاح، فتبقى الذاكرة والاتصالات
+        """
+        active = set()
         
         # OpenAI
         openai_key = config.get_api_key('openai')
         if openai_key and validate_api_key(openai_key, 'openai'):
             try:
                 for model in ['gpt-4o', 'gpt-4-turbo', 'gpt-3.5-turbo']:
-                    translator = create_translator('openai', openai_key, model)
-                    self.translator_manager.add_translator(model, translator)
+                    self.translator_manager.ensure_translator(model, 'openai', openai_key)
+                    active.add(model)
             except Exception as e:
                 print(f"خطأ في إعداد OpenAI: {e}")
                 
@@ -788,11 +1549,15 @@ class MainWindow(QMainWindow):
         if google_key and validate_api_key(google_key, 'google'):
             try:
                 for model in ['gemini-2.5-flash', 'gemini-2.5-pro']:
-                    translator = create_translator('google', google_key, model)
-                    self.translator_manager.add_translator(model, translator)
+                    self.translator_manager.ensure_translator(model, 'google', google_key)
+                    active.add(model)
             except Exception as e:
                 print(f"خطأ في إعداد Gemini: {e}")
                 
+        # حذف مترجمات المفاتيح المحذوفة أو غير الصالحة
+        for name in self.translator_manager.available_set - active:
+            self.translator_manager.remove_translator(name)
+                
     def setup_auto_save(self):
         """إعداد الحفظ التلقائي"""
         self.auto_save_timer.timeout.connect(self.auto_save)
@@ -800,21 +1565,48 @@ class MainWindow(QMainWindow):
             interval = config.get_setting('auto_save_interval', 5) * 60000  # تحويل لميللي ثانية
             self.auto_save_timer.start(interval)
             
+    def setup_cache_flush(self):
+        """كتابة الترجمات المعلقة في الذاكرة الدائمة على القرص بشكل دوري"""
+        self.cache_flush_timer.timeout.connect(persistent_translation_cache.flush)
+        self.cache_flush_timer.start(5000)  # كل 5 ثوان
+        
     def setup_connection_monitor(self):
         """إعداد مراقب الاتصال"""
         self.connection_check_timer.timeout.connect(self.check_connection)
         self.connection_check_timer.start(10000)  # فحص كل 10 ثوان
         
     def check_connection(self):
-        """فحص حالة الاتصال"""
-        if check_internet_connection():
-            self.connection_label.setText("🟢 متصل")
-            self.connection_label.setStyleSheet("color: green;")
+        """فحص حالة الاتصال في الخلفية"""
+        if self.connection_check_runnable is not None:
+            return  # الفحص السابق لم ينته بعد
+            
+        runnable = ConnectionCheckRunnable()
+        runnable.signals.checked.connect(self.on_connection_checked)
+        runnable.setAutoDelete(False)
+        self.connection_check_runnable = runnable
+        QThreadPool.globalInstance().start(runnable)
+        
+    def on_connection_checked(self, connected):
+        """عند انتهاء فحص الاتصال"""
+        self.connection_check_runnable = None
+        
+        # تحديث العنوان وتنسيقه عند تغير الحالة فقط
+        if connected != self.last_connection_state:
+            self.last_connection_state = connected
+            if connected:
+                self.connection_label.setText("🟢 متصل")
+                self.connection_label.setStyleSheet("color: green;")
+            else:
+                self.connection_label.setText("🔴 منقطع")
+                self.connection_label.setStyleSheet("color: red;")
+                
+        if connected:
             self.last_connection_time = time.time()
-        else:
-            self.connection_label.setText("🔴 منقطع")
-            self.connection_label.setStyleSheet("color: red;")
             
+            # استئناف خيط الترجمة فوراً إن كان ينتظر عودة الاتصال
+            if self.translation_thread and self.translation_thread.isRunning():
+                self.translation_thread.notify_online()
+        else:
             # حفظ تلقائي عند انقطاع الاتصال لفترة طويلة
             disconnect_time = time.time() - self.last_connection_time
             timeout = config.get_setting('connection_timeout', 180)
@@ -824,58 +1616,58 @@ class MainWindow(QMainWindow):
                 
     def emergency_save(self):
         """حفظ طارئ عند انقطاع الاتصال"""
-        try:
-            if self.file_handler.file_path and self.file_handler.modified:
-                self.file_handler.save_file(create_backup=True)
-                self.status_bar.showMessage("تم الحفظ الطارئ بسبب انقطاع الاتصال", 5000)
-        except Exception as e:
-            print(f"خطأ في الحفظ الطارئ: {e}")
+        if self.file_handler.file_path and self.file_handler.modified:
+            self.start_background_save(
+                True, "تم الحفظ الطارئ بسبب انقطاع الاتصال", 5000, "خطأ في الحفظ الطارئ"
+            )
+            
+    def start_background_save(self, create_backup, success_message, message_timeout, error_prefix,
+                              show_error_dialog=False):
+        """حفظ الملف في مجمع الحفظ وعرض النتيجة في شريط الحالة عند الانتهاء
+        
+        يعيد False إن كان حفظ سابق ما زال جارياً
+        """
+        if self.save_runnable is not None:
+            return False
+            
+        # النسخة تُؤخذ هنا في خيط الواجهة؛ أي تعديل بعدها يعيد modified إلى True
+        snapshot = self.file_handler.snapshot_for_save()
+        saved_items = self.file_handler.translations
+        self.file_handler.modified = False
+        
+        runnable = SaveFileRunnable(snapshot, create_backup)
+        runnable.signals.saved.connect(
+            lambda: self.on_background_save_done(success_message, message_timeout)
+        )
+        runnable.signals.failed.connect(
+            lambda error: self.on_background_save_failed(
+                saved_items,
+                f"{error_prefix}:\n{error}" if show_error_dialog else f"{error_prefix}: {error}",
+                show_error_dialog
+            )
+        )
+        runnable.setAutoDelete(False)
+        self.save_runnable = runnable
+        self.save_pool.start(runnable)
+        return True
+        
+    def on_background_save_done(self, message, message_timeout):
+        """عند انتهاء الحفظ في الخلفية"""
+        self.save_runnable = None
+        self.status_bar.showMessage(message, message_timeout)
+        
+    def on_background_save_failed(self, saved_items, error, show_error_dialog=False):
+        """عند فشل الحفظ في الخلفية: الملف ما زال غير محفوظ إن لم يُحمّل غيره"""
+        self.save_runnable = None
+        if self.file_handler.translations is saved_items:
+            self.file_handler.modified = True
+        print(error)
+        if show_error_dialog:
+            QMessageBox.critical(self, "خطأ", error)
             
     def apply_styles(self):
         """تطبيق التنسيقات المحدثة"""
-        self.setStyleSheet("""
-            QMainWindow {
-                background-color: #f5f5f5;
-            }
-            QPushButton {
-                background-color: #007bff;
-                color: white;
-                border: none;
-                padding: 8px 16px;
-                border-radius: 4px;
-                font-weight: bold;
-                min-height: 24px;
-            }
-            QPushButton:hover {
-                background-color: #0056b3;
-            }
-            QPushButton:pressed {
-                background-color: #003d82;
-            }
-            QPushButton:disabled {
-                background-color: #6c757d;
-            }
-            QTableWidget {
-                background-color: white;
-                border: 1px solid #dee2e6;
-                border-radius: 4px;
-                gridline-color: #e9ecef;
-            }
-            QTableWidget::item {
-                padding: 8px;
-                border-bottom: 1px solid #e9ecef;
-            }
-            QTableWidget::item:selected {
-                background-color: #cfe2ff;
-            }
-            QHeaderView::section {
-                background-color: #f8f9fa;
-                padding: 10px;
-                border: none;
-                border-bottom: 2px solid #dee2e6;
-                font-weight: bold;
-            }
-        """)
+        self.setStyleSheet(_MAIN_QSS)
         
     def open_file(self):
         """فتح ملف PHP"""
@@ -888,10 +1680,9 @@ class MainWindow(QMainWindow):
                 self.file_handler.load_file(file_path)
                 self.populate_table()
                 self.file_label.setText(f"الملف: {Path(file_path).name}")
-                self.update_stats()
                 
                 total_items = len(self.file_handler.translations)
-                needs_translation = len([item for item in self.file_handler.translations if item['needs_translation']])
+                needs_translation = sum(1 for item in self.file_handler.translations if item['needs_translation'])
                 
                 self.status_bar.showMessage(
                     f"تم فتح الملف: {Path(file_path).name} - "
@@ -902,227 +1693,62 @@ class MainWindow(QMainWindow):
                 QMessageBox.critical(self, "خطأ", f"فشل في فتح الملف:\n{str(e)}")
                 
     def populate_table(self):
-        """ملء الجدول بالبيانات مع تحسين الأداء للملفات الكبيرة"""
+        """ملء الجدول بالبيانات (النموذج يرسم الصفوف الظاهرة فقط)"""
         translations = self.file_handler.translations
         total_items = len(translations)
         
         print(f"📊 جارٍ تحميل {total_items} عنصر...")
         
-        # إعداد الجدول
-        self.table.setRowCount(total_items)
-        
-        # تحسينات الأداء للملفات الكبيرة
-        if total_items > 500:
-            # إيقاف التحديثات المؤقت
-            self.table.setUpdatesEnabled(False)
-            self.table.blockSignals(True)
-            
-            # إظهار progress dialog
-            from PyQt5.QtWidgets import QProgressDialog
-            progress = QProgressDialog("جارٍ تحميل البيانات...", "إلغاء", 0, total_items, self)
-            progress.setWindowModality(Qt.WindowModal)
-            progress.setMinimumDuration(0)
-            progress.show()
-        
-        try:
-            # تحسين ارتفاع الصفوف
-            self.table.verticalHeader().setDefaultSectionSize(50)  # ارتفاع أكبر
-            
-            # معالجة البيانات في دفعات لتجنب التجمد
-            batch_size = 100
-            for batch_start in range(0, total_items, batch_size):
-                batch_end = min(batch_start + batch_size, total_items)
-                
-                # معالجة الدفعة
-                for i in range(batch_start, batch_end):
-                    item = translations[i]
-                    
-                    # النص الأصلي (العمود 0)
-                    original_text = item['original_value']
-                    # تقصير النص المعروض للأداء
-                    display_text = original_text if len(original_text) <= 200 else original_text[:200] + "..."
-                    
-                    original_item = QTableWidgetItem(display_text)
-                    original_item.setFlags(original_item.flags() & ~Qt.ItemIsEditable)
-                    original_item.setToolTip(original_text)  # النص كامل في tooltip
-                    self.table.setItem(i, 0, original_item)
-                    
-                    # الترجمة (العمود 1)
-                    translation_text = item['translated_value']
-                    display_trans = translation_text if len(translation_text) <= 200 else translation_text[:200] + "..."
-                    
-                    translation_item = QTableWidgetItem(display_trans)
-                    translation_item.setToolTip(translation_text)
-                    self.table.setItem(i, 1, translation_item)
-                    
-                    # الحالة (العمود 2)
-                    status = determine_translation_status(item['original_value'], item['translated_value'])
-                    status_item = QTableWidgetItem(status)
-                    status_item.setFlags(status_item.flags() & ~Qt.ItemIsEditable)
-                    self.table.setItem(i, 2, status_item)
-                    
-                    # تلوين الصف
-                    self.apply_row_color(i, status, item.get('translation_type', 'none'))
-                    
-                    # أزرار الإجراءات - فقط للعناصر التي تحتاج ترجمة
-                    if item['needs_translation'] or not has_arabic_content(item['translated_value']):
-                        self.create_action_buttons(i)
-                    else:
-                        # عنصر فارغ للعناصر التي لا تحتاج ترجمة
-                        empty_item = QTableWidgetItem("-")
-                        empty_item.setFlags(empty_item.flags() & ~Qt.ItemIsEditable)
-                        self.table.setItem(i, 3, empty_item)
-                
-                # تحديث progress dialog
-                if total_items > 500:
-                    progress.setValue(batch_end)
-                    QApplication.processEvents()
-                    
-                    if progress.wasCanceled():
-                        break
-                
-                # فترة راحة قصيرة لتجنب تجمد الواجهة
-                if batch_end < total_items:
-                    QApplication.processEvents()
-                    
-        finally:
-            # إعادة تفعيل التحديثات
-            if total_items > 500:
-                self.table.setUpdatesEnabled(True)
-                self.table.blockSignals(False)
-                progress.close()
-            
-            # ضبط ارتفاع الصفوف تلقائياً
-            self.table.resizeRowsToContents()
-            
-            # التأكد من أن ارتفاع الصف لا يقل عن 50 بكسل
-            for row in range(min(100, total_items)):  # فقط أول 100 صف للأداء
-                if self.table.rowHeight(row) < 50:
-                    self.table.setRowHeight(row, 50)
+        self.table_model.load(translations, self.file_handler.get_item_statuses())
         
+        self.filter_table()
         self.update_stats()
         print(f"✅ تم تحميل {total_items} عنصر بنجاح")
         
-    def create_action_buttons(self, row):
-        """إنشاء أزرار الإجراءات مع ارتفاع مناسب"""
-        actions_widget = QWidget()
-        actions_layout = QHBoxLayout()
-        actions_layout.setContentsMargins(4, 4, 4, 4)
-        actions_layout.setSpacing(2)
-        
-        # زر الترجمة مع قائمة منسدلة
-        translate_btn = QPushButton("ترجمة")
-        translate_btn.setFixedSize(90, 40)  # ارتفاع أكبر
-        translate_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #28a745;
-                color: white;
-                border: none;
-                border-radius: 4px;
-                font-size: 10px;
-                font-weight: bold;
-                padding: 2px;
-            }
-            QPushButton:hover {
-                background-color: #218838;
-            }
-            QPushButton::menu-indicator {
-                width: 12px;
-                height: 8px;
-            }
-        """)
-        
-        # إنشاء قائمة منسدلة للترجمة
-        translate_menu = QMenu()
-        translate_menu.setStyleSheet("""
-            QMenu {
-                background-color: white;
-                border: 1px solid #ccc;
-                border-radius: 4px;
-                padding: 2px;
-            }
-            QMenu::item {
-                padding: 5px 10px;
-                border-radius: 2px;
-            }
-            QMenu::item:selected {
-                background-color: #e3f2fd;
-            }
-        """)
+    def create_row_actions_menu(self):
+        """إنشاء قائمة الترجمة المشتركة (تعمل على الصف المخزن في self.menu_row)"""
+        translate_menu = QMenu(self)
+        translate_menu.setStyleSheet(_ACTION_MENU_QSS)
         
         # ترجمة واحدة
         single_action = QAction("🔄 ترجمة عادية", self)
-        single_action.triggered.connect(lambda: self.translate_single_row(row))
+        single_action.triggered.connect(lambda: self.translate_single_row(self.menu_row))
         translate_menu.addAction(single_action)
         
         # ترجمات متعددة
         multiple_action = QAction("🎯 ترجمات متعددة", self)
-        multiple_action.triggered.connect(lambda: self.get_multiple_translations(row))
+        multiple_action.triggered.connect(lambda: self.get_multiple_translations(self.menu_row))
         translate_menu.addAction(multiple_action)
         
         # ترجمة اقتصادية
         economy_action = QAction("💰 ترجمة اقتصادية", self)
-        economy_action.triggered.connect(lambda: self.translate_economy_mode(row))
+        economy_action.triggered.connect(lambda: self.translate_economy_mode(self.menu_row))
         translate_menu.addAction(economy_action)
         
-        translate_btn.setMenu(translate_menu)
-        
-        actions_layout.addWidget(translate_btn)
-        actions_widget.setLayout(actions_layout)
-        
-        # تعيين ارتفاع مناسب للويدجت
-        actions_widget.setFixedHeight(48)
-        
-        self.table.setCellWidget(row, 3, actions_widget)
-        
-        # التأكد من ارتفاع الصف
-        if self.table.rowHeight(row) < 50:
-            self.table.setRowHeight(row, 50)
+        return translate_menu
         
-    def apply_row_color(self, row, status, translation_type):
-        """تطبيق لون الصف حسب الحالة"""
-        colors = {
-            "مترجم": {
-                "auto": QColor(200, 255, 200),  # أخضر فاتح للترجمة التلقائية
-                "manual": QColor(255, 255, 200),  # أصفر فاتح للترجمة اليدوية
-                "none": QColor(255, 255, 255)   # أبيض
-            },
-            "غير مترجم": QColor(255, 200, 200),  # أحمر فاتح
-            "لا يحتاج ترجمة": QColor(220, 220, 220)  # رمادي فاتح
-        }
+    def show_row_actions_menu(self, row, global_pos):
+        """عرض قائمة الترجمة لصف عند الضغط على زر الإجراءات"""
+        self.menu_row = row
+        self.row_actions_menu.exec_(global_pos)
         
-        if status == "مترجم":
-            color = colors["مترجم"][translation_type]
-        else:
-            color = colors.get(status, QColor(255, 255, 255))
-        
-        for col in range(self.table.columnCount()):
-            item = self.table.item(row, col)
-            if item:
-                item.setBackground(color)
-                
     def translate_single_row(self, row):
         """ترجمة صف واحد"""
         if not self.get_current_translator():
             QMessageBox.warning(self, "تحذير", "يرجى اختيار نموذج الترجمة أولاً!")
             return
             
-        original_text = self.table.item(row, 0).text()
+        original_text = self.table_model.originals[row]
         
         try:
             translated = self.translator_manager.translate(original_text)
-            self.table.item(row, 1).setText(translated)
             
-            # تحديث الحالة
-            status = determine_translation_status(original_text, translated)
-            self.table.item(row, 2).setText(status)
-            
-            # تطبيق اللون
-            self.apply_row_color(row, status, "auto")
+            # تحديث الترجمة والحالة واللون
+            self.table_model.set_translation(row, translated, "auto")
             
             # تحديث البيانات
             self.file_handler.update_translation(row, translated)
-            self.update_stats()
+            self.schedule_stats_update()
             
         except Exception as e:
             QMessageBox.critical(self, "خطأ", f"فشل في الترجمة:\n{str(e)}")
@@ -1133,7 +1759,7 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "تحذير", "يرجى اختيار نموذج الترجمة أولاً!")
             return
             
-        original_text = self.table.item(row, 0).text()
+        original_text = self.table_model.originals[row]
         
         try:
             translations = self.translator_manager.get_multiple_translations(original_text)
@@ -1142,37 +1768,33 @@ class MainWindow(QMainWindow):
                 dialog = MultiTranslationDialog(original_text, translations, self)
                 if dialog.exec_() == QDialog.Accepted:
                     selected = dialog.selected_translation
-                    self.table.item(row, 1).setText(selected)
                     
-                    # تحديث الحالة واللون
-                    status = determine_translation_status(original_text, selected)
-                    self.table.item(row, 2).setText(status)
-                    self.apply_row_color(row, status, "manual")
+                    # تحديث الترجمة والحالة واللون
+                    self.table_model.set_translation(row, selected, "manual")
                     
                     # تحديث البيانات
                     self.file_handler.update_translation(row, selected)
-                    self.update_stats()
+                    self.schedule_stats_update()
             else:
                 QMessageBox.information(self, "معلومات", "لم يتم العثور على ترجمات متعددة")
                 
         except Exception as e:
+            QMessageBox.critical(self, "خطأ", f"فشل في الحصول على الترجمات:\n{str(e)}")
+            
     def translate_economy_mode(self, row):
         """ترجمة اقتصادية باستخدام أرخص نموذج متاح"""
         # ترتيب النماذج حسب التكلفة (من الأرخص للأغلى)
         economy_models = ['gpt-3.5-turbo', 'gemini-2.5-flash', 'gemini-2.5-pro', 'gpt-4-turbo', 'gpt-4o']
         
         # البحث عن أرخص نموذج متاح
-        selected_model = None
-        for model in economy_models:
-            if model in self.translator_manager.get_available_translators():
-                selected_model = model
-                break
+        available = self.translator_manager.available_set
+        selected_model = next((model for model in economy_models if model in available), None)
         
         if not selected_model:
             QMessageBox.warning(self, "تحذير", "لا يوجد نماذج متاحة!")
             return
             
-        original_text = self.table.item(row, 0).text()
+        original_text = self.table_model.originals[row]
         
         # إظهار رسالة التوفير
         cost_info = self.get_model_cost_info(selected_model, original_text)
@@ -1188,18 +1810,12 @@ class MainWindow(QMainWindow):
             
             progress.close()
             
-            self.table.item(row, 1).setText(translated)
-            
-            # تحديث الحالة
-            status = determine_translation_status(original_text, translated)
-            self.table.item(row, 2).setText(status)
-            
-            # تطبيق اللون للترجمة الاقتصادية
-            self.apply_row_color(row, status, "auto")
+            # تحديث الترجمة والحالة واللون للترجمة الاقتصادية
+            self.table_model.set_translation(row, translated, "auto")
             
             # تحديث البيانات
             self.file_handler.update_translation(row, translated, "economy")
-            self.update_stats()
+            self.schedule_stats_update()
             
             # إظهار معلومات التوفير
             QMessageBox.information(self, "ترجمة اقتصادية ✅", 
@@ -1226,7 +1842,8 @@ class MainWindow(QMainWindow):
             
     def translate_all(self):
         """ترجمة جميع النصوص مع تحسين التكلفة والأداء"""
-        if not self.get_current_translator():
+        current_model = self.get_current_translator()
+        if not current_model:
             QMessageBox.warning(self, "تحذير", "يرجى اختيار نموذج الترجمة أولاً!")
             return
             
@@ -1235,7 +1852,7 @@ class MainWindow(QMainWindow):
         total_words = 0
         
         for i, translation_item in enumerate(self.file_handler.translations):
-            if translation_item['needs_translation'] and not has_arabic_content(translation_item['translated_value']):
+            if translation_item['needs_translation'] and not translation_item['is_translated']:
                 text = translation_item['original_value']
                 words = count_words(text)
                 total_words += words
@@ -1246,14 +1863,13 @@ class MainWindow(QMainWindow):
             return
         
         # تحليل التكلفة واقتراح أفضل استراتيجية
-        current_model = self.get_current_translator()
         estimated_cost = estimate_cost(total_words, current_model)
         
         # اقتراح الاستراتيجية الاقتصادية
-        economy_strategy = self.suggest_economy_strategy(untranslated, current_model)
+        economy_strategy = self.suggest_economy_strategy(untranslated, current_model, total_words)
         
         # عرض نافذة تحليل التكلفة
-        cost_dialog = CostAnalysisDialog(untranslated, current_model, economy_strategy, self)
+        cost_dialog = CostAnalysisDialog(untranslated, current_model, economy_strategy, self, total_words)
         if cost_dialog.exec_() != QDialog.Accepted:
             return
             
@@ -1263,41 +1879,68 @@ class MainWindow(QMainWindow):
         # بدء الترجمة الذكية
         self.start_smart_translation(untranslated, selected_strategy)
         
-    def suggest_economy_strategy(self, untranslated_items, current_model):
+    def suggest_economy_strategy(self, untranslated_items, current_model, total_words=None):
         """اقتراح استراتيجية اقتصادية للترجمة"""
-        # تحليل النصوص
-        short_texts = [(i, text, words) for i, text, words in untranslated_items if words <= 5]
-        medium_texts = [(i, text, words) for i, text, words in untranslated_items if 5 < words <= 15]
-        long_texts = [(i, text, words) for i, text, words in untranslated_items if words > 15]
+        if total_words is None:
+            total_words = sum(words for _, _, words in untranslated_items)
+            
+        # تحليل النصوص وجمع كلمات كل فئة في مرور واحد
+        short_texts, medium_texts, long_texts = [], [], []
+        short_words = medium_words = long_words = 0
+        for entry in untranslated_items:
+            words = entry[2]
+            if words <= 5:
+                short_texts.append(entry)
+                short_words += words
+            elif words <= 15:
+                medium_texts.append(entry)
+                medium_words += words
+            else:
+                long_texts.append(entry)
+                long_words += words
         
         # حساب التكاليف للاستراتيجيات المختلفة
         strategies = {
-            'current_model': {
+            STRATEGY_CURRENT: {
+                'kind': STRATEGY_CURRENT,
                 'name': f'الحالي ({current_model})',
                 'description': f'استخدام {current_model} لجميع النصوص',
-                'cost': estimate_cost(sum(words for _, _, words in untranslated_items), current_model),
+                'cost': estimate_cost(total_words, current_model),
                 'items': untranslated_items
             },
-            'mixed_economy': {
+            STRATEGY_MIXED: {
+                'kind': STRATEGY_MIXED,
                 'name': 'مختلط اقتصادي',
                 'description': 'نصوص قصيرة: GPT-3.5، متوسطة: Gemini Flash، طويلة: النموذج الحالي',
-                'cost': (estimate_cost(sum(words for _, _, words in short_texts), 'gpt-3.5-turbo') +
-                        estimate_cost(sum(words for _, _, words in medium_texts), 'gemini-2.5-flash') +
-                        estimate_cost(sum(words for _, _, words in long_texts), current_model)),
+                'cost': (estimate_cost(short_words, 'gpt-3.5-turbo') +
+                        estimate_cost(medium_words, 'gemini-2.5-flash') +
+                        estimate_cost(long_words, current_model)),
                 'items': {
                     'short': short_texts,
                     'medium': medium_texts, 
                     'long': long_texts
                 }
             },
-            'full_economy': {
+            STRATEGY_FULL_ECONOMY: {
+                'kind': STRATEGY_FULL_ECONOMY,
                 'name': 'اقتصادي كامل',
                 'description': 'استخدام GPT-3.5 Turbo لجميع النصوص',
-                'cost': estimate_cost(sum(words for _, _, words in untranslated_items), 'gpt-3.5-turbo'),
+                'cost': estimate_cost(total_words, 'gpt-3.5-turbo'),
                 'items': untranslated_items
             }
         }
         
+        # Batch API لنماذج OpenAI: نفس النموذج بنصف التكلفة مع تنفيذ غير متزامن
+        if isinstance(self.translator_manager.translators.get(current_model), GPTTranslator):
+            strategies[STRATEGY_BATCH_API] = {
+                'kind': STRATEGY_BATCH_API,
+                'name': 'Batch API (أرخص 50%، حتى 24 ساعة)',
+                'description': f'إرسال جميع النصوص لـ {current_model} كمهمة خلفية عبر OpenAI Batch API',
+                'cost': strategies[STRATEGY_CURRENT]['cost'] * 0.5,
+                'items': untranslated_items,
+                'background': True
+            }
+        
         return strategies
         
     def start_smart_translation(self, items, strategy):
@@ -1311,8 +1954,13 @@ class MainWindow(QMainWindow):
         self.translate_selected_btn.setEnabled(False)
         self.stop_btn.setEnabled(True)
         
+        kind = strategy['kind']
+        if kind == STRATEGY_BATCH_API:
+            self.start_batch_api_translation(items, current_translator)
+            return
+        
         # إعداد العناصر للترجمة حسب الاستراتيجية
-        if strategy['name'].startswith('مختلط'):
+        if kind == STRATEGY_MIXED:
             # ترجمة مختلطة - نماذج مختلفة حسب طول النص
             translation_queue = []
             
@@ -1328,7 +1976,7 @@ class MainWindow(QMainWindow):
             for i, text, words in strategy['items']['long']:
                 translation_queue.append((i, text, current_translator))
                 
-        elif strategy['name'].startswith('اقتصادي كامل'):
+        elif kind == STRATEGY_FULL_ECONOMY:
             # استخدام GPT-3.5 للجميع
             translation_queue = [(i, text, 'gpt-3.5-turbo') for i, text, words in items]
         else:
@@ -1344,7 +1992,7 @@ class MainWindow(QMainWindow):
         )
         
         self.translation_thread.progress_updated.connect(self.update_translation_progress)
-        self.translation_thread.translation_completed.connect(self.on_translation_completed)
+        self.translation_thread.translation_batch_completed.connect(self.on_translation_batch_completed)
         self.translation_thread.error_occurred.connect(self.on_translation_error)
         self.translation_thread.finished_all.connect(self.on_translation_finished)
         self.translation_thread.cost_saved.connect(self.show_cost_savings)
@@ -1352,30 +2000,48 @@ class MainWindow(QMainWindow):
         self.translation_thread.start()
         self.status_bar.showMessage(f"جارٍ تطبيق الاستراتيجية: {strategy['name']}")
         
+    def start_batch_api_translation(self, items, translator_name):
+        """بدء الترجمة عبر OpenAI Batch API في الخلفية"""
+        self.progress_bar.setMaximum(len(items))
+        self.progress_bar.setValue(0)
+        
+        self.translation_thread = BatchAPITranslationThread(
+            self.translator_manager, [(i, text) for i, text, words in items], translator_name
+        )
+        
+        self.translation_thread.progress_updated.connect(self.update_translation_progress)
+        self.translation_thread.translation_batch_completed.connect(self.on_translation_batch_completed)
+        self.translation_thread.error_occurred.connect(self.on_translation_error)
+        self.translation_thread.status_changed.connect(self.status_bar.showMessage)
+        self.translation_thread.finished_all.connect(self.on_translation_finished)
+        
+        self.translation_thread.start()
+        self.status_bar.showMessage("جارٍ إرسال المهمة إلى Batch API...")
+        
     def translate_selected(self):
         """ترجمة الصفوف المحددة"""
         if not self.get_current_translator():
             QMessageBox.warning(self, "تحذير", "يرجى اختيار نموذج الترجمة أولاً!")
             return
             
-        selected_rows = []
-        for item in self.table.selectedItems():
-            if item.column() == 0:
-                selected_rows.append(item.row())
+        selected_rows = sorted(
+            self.table_proxy.mapToSource(index).row()
+            for index in self.table.selectionModel().selectedRows()
+        )
                 
         if not selected_rows:
             QMessageBox.warning(self, "تحذير", "يرجى تحديد صفوف للترجمة!")
             return
             
-        items_to_translate = []
-        for row in selected_rows:
-            original_text = self.table.item(row, 0).text()
-            items_to_translate.append((row, original_text))
-            
-        self.start_batch_translation(items_to_translate)
+        originals = self.table_model.originals
+        items_to_translate = ((row, originals[row]) for row in selected_rows)
+        self.start_batch_translation(items_to_translate, len(selected_rows))
+        
+    def start_batch_translation(self, items, total):
+        """بدء الترجمة الدفعية
         
-    def start_batch_translation(self, items):
-        """بدء الترجمة الدفعية"""
+        تُمرر العناصر إلى خيط الترجمة عبر طابور محدود بدلاً من قائمة كاملة
+        """
         current_translator = self.get_current_translator()
         if not current_translator:
             return
@@ -1385,20 +2051,26 @@ class MainWindow(QMainWindow):
         self.translate_selected_btn.setEnabled(False)
         self.stop_btn.setEnabled(True)
         
-        self.progress_bar.setMaximum(len(items))
+        self.progress_bar.setMaximum(total)
         self.progress_bar.setValue(0)
         
         # بدء خيط الترجمة
+        items_queue = queue.Queue(maxsize=100)
         self.translation_thread = TranslationThread(
-            self.translator_manager, items, current_translator
+            self.translator_manager, items_queue, current_translator, total
         )
         
         self.translation_thread.progress_updated.connect(self.update_translation_progress)
-        self.translation_thread.translation_completed.connect(self.on_translation_completed)
+        self.translation_thread.translation_batch_completed.connect(self.on_translation_batch_completed)
         self.translation_thread.error_occurred.connect(self.on_translation_error)
         self.translation_thread.finished_all.connect(self.on_translation_finished)
         
         self.translation_thread.start()
+        threading.Thread(
+            target=feed_translation_queue,
+            args=(items, items_queue, self.translation_thread.cancel_event),
+            daemon=True
+        ).start()
         
     def update_translation_progress(self, current, total):
         """تحديث تقدم الترجمة"""
@@ -1406,24 +2078,24 @@ class MainWindow(QMainWindow):
         percentage = int((current / total) * 100) if total > 0 else 0
         self.progress_bar.setFormat(f"{current}/{total} - {percentage}%")
         
-    def on_translation_completed(self, row_index, translated_text, translation_type):
-        """عند اكتمال ترجمة نص واحد"""
-        translation_item = self.table.item(row_index, 1)
-        status_item = self.table.item(row_index, 2)
+    def on_translation_batch_completed(self, results):
+        """عند اكتمال دفعة ترجمات [(الصف، الترجمة، النوع), ...]"""
+        row_count = self.table_model.rowCount()
+        changed_rows = []
         
-        if translation_item:
-            translation_item.setText(translated_text)
+        for row_index, translated_text, translation_type in results:
+            if 0 <= row_index < row_count:
+                # تحديث الترجمة والحالة واللون دون إعادة الرسم لكل صف
+                self.table_model.set_translation(row_index, translated_text, translation_type, notify=False)
+                changed_rows.append(row_index)
             
-        if status_item:
-            original_text = self.table.item(row_index, 0).text()
-            status = determine_translation_status(original_text, translated_text)
-            status_item.setText(status)
+            # تحديث البيانات
+            self.file_handler.update_translation(row_index, translated_text)
             
-            # تطبيق اللون
-            self.apply_row_color(row_index, status, translation_type)
-        
-        # تحديث البيانات
-        self.file_handler.update_translation(row_index, translated_text)
+        # إعادة رسم نطاق الصفوف المتأثرة مرة واحدة
+        if changed_rows:
+            self.table_model.notify_rows_changed(min(changed_rows), max(changed_rows))
+        self.schedule_stats_update()
         
     def on_translation_error(self, error_message):
         """معالجة أخطاء الترجمة"""
@@ -1437,6 +2109,7 @@ class MainWindow(QMainWindow):
         
         self.progress_bar.setFormat("اكتمل!")
         self.update_stats()
+        self.filter_table()
         self.status_bar.showMessage("انتهت الترجمة")
         
     def show_cost_savings(self, saved_amount, message):
@@ -1463,16 +2136,33 @@ class MainWindow(QMainWindow):
         
         self.progress_bar.setFormat("تم الإيقاف")
         self.update_stats()
+        self.filter_table()
         self.status_bar.showMessage("تم إيقاف الترجمة")
         
+    def on_model_changed(self, index):
+        """عند اختيار نموذج آخر من القائمة"""
+        self.current_model = self.model_combo.itemData(index)
+        
     def get_current_translator(self):
         """الحصول على المترجم الحالي"""
-        current_model = self.model_combo.currentData()
-        if current_model and current_model in self.translator_manager.get_available_translators():
+        current_model = self.current_model
+        if current_model and current_model in self.translator_manager.available_set:
             self.translator_manager.set_current_translator(current_model)
             return current_model
         return None
         
+    def schedule_stats_update(self):
+        """جدولة تحديث واحد للإحصائيات بدلاً من تحديث بعد كل ترجمة"""
+        if self.stats_update_pending:
+            return
+        self.stats_update_pending = True
+        QTimer.singleShot(50, self.flush_stats_update)
+        
+    def flush_stats_update(self):
+        """تنفيذ تحديث الإحصائيات المجدول"""
+        self.stats_update_pending = False
+        self.update_stats()
+        
     def update_stats(self):
         """تحديث الإحصائيات"""
         if hasattr(self.file_handler, 'translations'):
@@ -1503,68 +2193,29 @@ class MainWindow(QMainWindow):
                     self.progress_bar.setMaximum(1)
                     self.progress_bar.setValue(1)
                     self.progress_bar.setFormat("مكتمل 100%")
-                    
-            self.filter_table()
             
     def filter_table(self):
         """تصفية الجدول"""
         search_text = self.search_input.text().lower()
         filter_type = self.filter_combo.currentText()
         
-        visible_count = 0
-        
-        for row in range(self.table.rowCount()):
-            show_row = True
-            
-            # فلتر النص
-            if search_text:
-                text_found = False
-                for col in range(2):  # البحث في النص الأصلي والترجمة
-                    item = self.table.item(row, col)
-                    if item and search_text in item.text().lower():
-                        text_found = True
-                        break
-                if not text_found:
-                    show_row = False
-            
-            # فلتر الحالة
-            if show_row and filter_type != "عرض الكل":
-                status_item = self.table.item(row, 2)
-                if status_item:
-                    status = status_item.text()
-                    if filter_type == "يحتاج ترجمة فقط" and status not in ["غير مترجم"]:
-                        show_row = False
-                    elif filter_type == "مترجم فقط" and status != "مترجم":
-                        show_row = False
-                    elif filter_type == "لا يحتاج ترجمة" and status != "لا يحتاج ترجمة":
-                        show_row = False
-            
-            self.table.setRowHidden(row, not show_row)
-            if show_row:
-                visible_count += 1
-                
-        self.results_label.setText(f"{visible_count} عنصر")
+        model = self.table_model
         
-    def on_cell_changed(self, row, column):
-        """عند تغيير خلية في الجدول"""
-        if column == 1:  # عمود الترجمة
-            translation_item = self.table.item(row, column)
-            status_item = self.table.item(row, 2)
-            
-            if translation_item and status_item:
-                new_translation = translation_item.text()
-                original_text = self.table.item(row, 0).text()
-                
-                # تحديث الحالة
-                status = determine_translation_status(original_text, new_translation)
-                status_item.setText(status)
-                
-                # تطبيق اللون للتحرير اليدوي
-                self.apply_row_color(row, status, "manual")
-                
-                # تحديث البيانات
-                self.file_handler.update_translation(row, new_translation)
-                self.update_stats()
+        # الحالة المطلوبة لكل نوع فلتر
+        wanted_status = {
+            "يحتاج ترجمة فقط": model.STATUS_UNTRANSLATED,
+            "مترجم فقط": model.STATUS_TRANSLATED,
+            "لا يحتاج ترجمة": model.STATUS_NO_NEED
+        }.get(filter_type)
+        
+        self.table_proxy.set_filter(search_text, wanted_status)
+        self.results_label.setText(f"{self.table_proxy.rowCount()} عنصر")
+        
+    def on_translation_edited(self, row, new_translation):
+        """عند تحرير الترجمة يدوياً في الجدول (الحالة واللون يحدثهما النموذج)"""
+        # تحديث البيانات
+        self.file_handler.update_translation(row, new_translation)
+        self.schedule_stats_update()
                 
     def save_file(self):
         """حفظ الملف الحالي"""
@@ -1572,13 +2223,12 @@ class MainWindow(QMainWindow):
             self.save_file_as()
             return
             
-        try:
-            backup = config.get_setting('backup_files', True)
-            self.file_handler.save_file(create_backup=backup)
-            self.status_bar.showMessage("تم الحفظ بنجاح")
-            
-        except Exception as e:
-            QMessageBox.critical(self, "خطأ", f"فشل في حفظ الملف:\n{str(e)}")
+        # الكتابة في مجمع الحفظ حتى لا تتجمد الواجهة مع الملفات الكبيرة
+        backup = config.get_setting('backup_files', True)
+        if self.start_background_save(backup, "تم الحفظ بنجاح", 0, "فشل في حفظ الملف", True):
+            self.status_bar.showMessage("جارٍ الحفظ...")
+        else:
+            self.status_bar.showMessage("حفظ سابق ما زال جارياً، حاول مرة أخرى بعد انتهائه", 3000)
             
     def save_file_as(self):
         """حفظ الملف باسم جديد"""
@@ -1586,11 +2236,17 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "تحذير", "لا يوجد ملف للحفظ!")
             return
             
+        if self.save_runnable is not None:
+            self.status_bar.showMessage("حفظ سابق ما زال جارياً، حاول مرة أخرى بعد انتهائه", 3000)
+            return
+            
         file_path, _ = QFileDialog.getSaveFileName(
             self, "حفظ الملف", "", "ملفات PHP (*.php);;جميع الملفات (*)"
         )
         
         if file_path:
+            # قد يبدأ حفظ تلقائي أثناء نافذة اختيار الملف، فلا يُكتب بالتوازي معه
+            self.save_pool.waitForDone()
             try:
                 self.file_handler.save_file(file_path, create_backup=False)
                 self.file_label.setText(f"الملف: {Path(file_path).name}")
@@ -1648,7 +2304,6 @@ class MainWindow(QMainWindow):
                 # تحديث الواجهة
                 self.populate_table()
                 self.file_label.setText(f"المشروع: {self.project_name}")
-                self.update_stats()
                 
                 QMessageBox.information(self, "نجح", f"تم تحميل المشروع: {self.project_name}")
                 
@@ -1658,11 +2313,7 @@ class MainWindow(QMainWindow):
     def auto_save(self):
         """الحفظ التلقائي"""
         if self.file_handler.file_path and self.file_handler.modified:
-            try:
-                self.file_handler.save_file(create_backup=False)
-                self.status_bar.showMessage("تم الحفظ التلقائي", 2000)
-            except Exception as e:
-                print(f"خطأ في الحفظ التلقائي: {e}")
+            self.start_background_save(False, "تم الحفظ التلقائي", 2000, "خطأ في الحفظ التلقائي")
                 
     def export_csv(self):
         """تصدير الترجمات إلى CSV"""
@@ -1671,12 +2322,13 @@ class MainWindow(QMainWindow):
             return
             
         file_path, _ = QFileDialog.getSaveFileName(
-            self, "تصدير CSV", "", "ملفات CSV (*.csv);;جميع الملفات (*)"
+            self, "تصدير CSV", "", "ملفات CSV (*.csv);;ملفات CSV مضغوطة (*.csv.gz);;جميع الملفات (*)"
         )
         
         if file_path:
             try:
-                self.file_handler.export_translations_csv(file_path)
+                compress = 'gzip' if file_path.lower().endswith('.gz') else None
+                self.file_handler.export_translations_csv(file_path, compress=compress)
                 QMessageBox.information(self, "نجح", "تم التصدير بنجاح!")
                 
             except Exception as e:
@@ -1699,6 +2351,7 @@ class MainWindow(QMainWindow):
         if reply == QMessageBox.Yes:
             translation_cache.cache.clear()
             translation_cache.save_cache()
+            persistent_translation_cache.clear()
             QMessageBox.information(self, "تم", "تم مسح الذاكرة المؤقتة!")
             
     def show_about(self):
@@ -1733,6 +2386,9 @@ class MainWindow(QMainWindow):
             self.translation_thread.wait()
             
         translation_cache.save_cache()
+        persistent_translation_cache.flush()
+        # انتظار أي حفظ جارٍ في الخلفية قبل سؤال المستخدم
+        self.save_pool.waitForDone()
         
         if self.file_handler.file_path and self.file_handler.modified:
             reply = QMessageBox.question(
@@ -1741,7 +2397,13 @@ class MainWindow(QMainWindow):
             )
             
             if reply == QMessageBox.Yes:
-                self.save_file()
+                # حفظ مباشر هنا: البرنامج سيُغلق ولا ينتظر حفظاً في الخلفية
+                try:
+                    self.file_handler.save_file(create_backup=config.get_setting('backup_files', True))
+                except Exception as e:
+                    QMessageBox.critical(self, "خطأ", f"فشل في حفظ الملف:\n{str(e)}")
+                    event.ignore()
+                    return
             elif reply == QMessageBox.Cancel:
                 event.ignore()
                 return
@@ -5,12 +5,42 @@
 
 import gc
 import time
+import ctypes
 import psutil
 import threading
 from queue import Queue
-from PyQt5.QtCore import QObject, pyqtSignal, QTimer
+from PyQt5.QtCore import QObject, QThread, pyqtSignal, pyqtSlot, QTimer
 from PyQt5.QtWidgets import QMessageBox, QProgressDialog, QApplication
 
+# malloc_trim من glibc تُحمّل مرة واحدة (غير متوفرة على Windows/macOS)
+try:
+    _malloc_trim = ctypes.CDLL("libc.so.6").malloc_trim
+    _malloc_trim.argtypes = [ctypes.c_size_t]
+    _malloc_trim.restype = ctypes.c_int
+except (OSError, AttributeError):
+    _malloc_trim = None
+
+class PerformanceMonitorWorker(QObject):
+    """تشغيل فحص الأداء الدوري في خيط منفصل حتى لا تعطل قراءات psutil الواجهة"""
+    
+    def __init__(self, manager, interval):
+        super().__init__()
+        self.manager = manager
+        self.interval = interval
+        self.timer = None
+        
+    @pyqtSlot()
+    def start(self):
+        """إنشاء المؤقت داخل خيط العامل ليعمل على حلقة أحداثه"""
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.check)
+        self.timer.start(self.interval)
+        
+    @pyqtSlot()
+    def check(self):
+        # الإشارات تصل لمستقبليها في خيط الواجهة تلقائياً عبر اتصال queued
+        self.manager.check_performance()
+
 class PerformanceManager(QObject):
     """مدير الأداء والذاكرة"""
     
@@ -24,20 +54,32 @@ class PerformanceManager(QObject):
         self.memory_threshold = 800  # MB
         self.cpu_threshold = 80  # %
         
-        # مؤقت المراقبة
-        self.monitor_timer = QTimer()
-        self.monitor_timer.timeout.connect(self.check_performance)
+        # خيط المراقبة وعامله (يُنشآن عند بدء المراقبة)
+        self.monitor_thread = None
+        self.monitor_worker = None
         
     def start_monitoring(self, interval=5000):
         """بدء مراقبة الأداء (interval بالميللي ثانية)"""
+        if self.monitoring_active:
+            self.stop_monitoring()
         self.monitoring_active = True
-        self.monitor_timer.start(interval)
+        
+        self.monitor_thread = QThread()
+        self.monitor_worker = PerformanceMonitorWorker(self, interval)
+        self.monitor_worker.moveToThread(self.monitor_thread)
+        self.monitor_thread.started.connect(self.monitor_worker.start)
+        self.monitor_thread.start()
         print(f"🔍 بدء مراقبة الأداء كل {interval/1000} ثانية")
         
     def stop_monitoring(self):
         """إيقاف مراقبة الأداء"""
         self.monitoring_active = False
-        self.monitor_timer.stop()
+        if self.monitor_thread is not None:
+            # إنهاء حلقة أحداث الخيط يوقف مؤقت العامل معه
+            self.monitor_thread.quit()
+            self.monitor_thread.wait()
+            self.monitor_thread = None
+            self.monitor_worker = None
         print("⏹️ تم إيقاف مراقبة الأداء")
         
     def check_performance(self):
@@ -79,16 +121,9 @@ class PerformanceManager(QObject):
         print(f"   🗑️ تم تحرير {collected} كائن")
         
         # محاولة تحرير الذاكرة على مستوى النظام
-        try:
-            import ctypes
-            if hasattr(ctypes, 'CDLL'):
-                try:
-                    ctypes.CDLL("libc.so.6").malloc_trim(0)
-                    print("   💾 تم تحرير ذاكرة النظام")
-                except:
-                    pass
-        except:
-            pass
+        if _malloc_trim is not None:
+            _malloc_trim(0)
+            print("   💾 تم تحرير ذاكرة النظام")
             
     def get_memory_usage(self):
         """الحصول على معلومات استخدام الذاكرة"""
@@ -137,11 +172,14 @@ class LoadingManager(QObject):
     loading_completed = pyqtSignal()
     loading_cancelled = pyqtSignal()
     
+    UI_UPDATE_INTERVAL = 0.033  # أقصى معدل لتحديث نافذة التقدم (~30 مرة في الثانية)
+    
     def __init__(self, parent=None):
         super().__init__(parent)
         self.parent_widget = parent
         self.is_cancelled = False
         self.progress_dialog = None
+        self.last_ui_update = 0.0
         
     def start_loading(self, total_items, title="جارٍ التحميل..."):
         """بدء عملية التحميل مع progress dialog"""
@@ -164,10 +202,16 @@ class LoadingManager(QObject):
     def update_progress(self, current, total, message=""):
         """تحديث تقدم التحميل"""
         if self.progress_dialog:
+            # تجاهل التحديثات المتقاربة عدا الأخير
+            now = time.monotonic()
+            if now - self.last_ui_update < self.UI_UPDATE_INTERVAL and current != total:
+                return
+            self.last_ui_update = now
+            
             self.progress_dialog.setValue(current)
             self.progress_dialog.setLabelText(f"{message}\n{current:,} / {total:,}")
             
-            # تحديث الواجهة
+            # تحديث الواجهة (يشمل زر الإلغاء فلا تُستبعد أحداث المستخدم)
             QApplication.processEvents()
             
     def cancel_loading(self):
@@ -193,17 +237,29 @@ class BatchProcessor:
         self.batch_size = batch_size
         self.processed_count = 0
         
-    def process_in_batches(self, items, process_func, progress_callback=None):
-        """معالجة العناصر في دفعات"""
+    def process_in_batches(self, items, process_func, progress_callback=None, yield_callback=None):
+        """معالجة العناصر في دفعات
+        
+        yield_callback: يُستدعى بعد كل دفعة لإبقاء الواجهة مستجيبة
+        (مثل QApplication.processEvents)، ولا حاجة له خارج الواجهة
+        """
         total_items = len(items)
         results = []
+        memory_limit = performance_manager.memory_threshold * 0.9
         
         for i in range(0, total_items, self.batch_size):
             batch = items[i:i + self.batch_size]
             
             try:
-                # معالجة الدفعة
-                batch_results = process_func(batch)
+                # معالجة الدفعة مع إيقاف جامع القمامة التلقائي أثناءها فقط
+                # (كثرة القواميس المؤقتة تشغله باستمرار)، ويعود قبل أي كود آخر
+                gc_was_enabled = gc.isenabled()
+                gc.disable()
+                try:
+                    batch_results = process_func(batch)
+                finally:
+                    if gc_was_enabled:
+                        gc.enable()
                 
                 if isinstance(batch_results, list):
                     results.extend(batch_results)
@@ -216,11 +272,11 @@ class BatchProcessor:
                 if progress_callback:
                     progress_callback(self.processed_count, total_items, f"تمت معالجة {self.processed_count} عنصر")
                 
-                # فترة راحة لتجنب التجمد
-                time.sleep(0.01)
+                if yield_callback:
+                    yield_callback()
                 
-                # تحسين الذاكرة كل 10 دفعات
-                if (i // self.batch_size) % 10 == 0:
+                # تحسين الذاكرة عند اقترابها من الحد فقط
+                if performance_manager.process.memory_info().rss / 1024 / 1024 > memory_limit:
                     gc.collect()
                     
             except Exception as e:
@@ -233,19 +289,34 @@ class BatchProcessor:
 class ResourceMonitor:
     """مراقب الموارد المتقدم"""
     
+    SAMPLE_EVERY = 64  # قراءة الذاكرة مرة كل هذا العدد من العمليات
+    SAMPLE_INTERVAL = 0.5  # أو بعد مرور هذه المدة بالثواني
+    
     def __init__(self):
         self.start_time = time.time()
         self.peak_memory = 0
         self.total_operations = 0
+        self.process = psutil.Process()
+        self.current_memory = 0
+        self.last_sample = 0.0
+        
+    def sample_memory(self):
+        """قراءة الذاكرة الحالية وتحديث الذروة"""
+        self.current_memory = self.process.memory_info().rss / 1024 / 1024
+        self.last_sample = time.monotonic()
+        if self.current_memory > self.peak_memory:
+            self.peak_memory = self.current_memory
+        return self.current_memory
         
     def log_operation(self, operation_name, duration=None):
         """تسجيل عملية"""
         self.total_operations += 1
         
-        # مراقبة الذاكرة
-        current_memory = psutil.Process().memory_info().rss / 1024 / 1024
-        if current_memory > self.peak_memory:
-            self.peak_memory = current_memory
+        # مراقبة الذاكرة (بالعينات لا مع كل عملية، إلا إذا كانت ستُطبع)
+        if (duration or self.total_operations % self.SAMPLE_EVERY == 0
+                or time.monotonic() - self.last_sample > self.SAMPLE_INTERVAL):
+            self.sample_memory()
+        current_memory = self.current_memory
             
         if duration:
             print(f"⚡ {operation_name}: {duration:.2f}s | ذاكرة: {current_memory:.1f}MB")
@@ -253,7 +324,7 @@ class ResourceMonitor:
     def get_performance_summary(self):
         """الحصول على ملخص الأداء"""
         total_time = time.time() - self.start_time
-        current_memory = psutil.Process().memory_info().rss / 1024 / 1024
+        current_memory = self.sample_memory()
         
         return {
             'total_time': total_time,
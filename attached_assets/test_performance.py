@@ -8,6 +8,7 @@ import sys
 import time
 import random
 import string
+import tempfile
 from pathlib import Path
 
 # إضافة مسار المشروع
@@ -33,7 +34,19 @@ class PerformanceTest:
         """إنشاء ملف PHP للاختبار"""
         print(f"🔧 إنشاء ملف اختبار مع {num_items:,} عنصر...")
         
-        content = "<?php\n\nreturn [\n"
+        # كتابة الملف سطراً بسطر عبر مخزن مؤقت كبير بدلاً من بناء نص ضخم بالتجميع المتكرر
+        total_chars = 0
+        with open(output_path, 'w', encoding='utf-8', buffering=1 << 20) as f:
+            for line in self._iter_test_php_lines(num_items):
+                f.write(line)
+                total_chars += len(line)
+            
+        print(f"✅ تم إنشاء {output_path} ({total_chars:,} حرف)")
+        return output_path
+    
+    def _iter_test_php_lines(self, num_items):
+        """توليد أسطر ملف PHP للاختبار واحداً تلو الآخر"""
+        yield "<?php\n\nreturn [\n"
         
         for i in range(num_items):
             # نصوص متنوعة للاختبار
@@ -48,21 +61,14 @@ class PerformanceTest:
                 text = self.generate_random_text(16, 30)
             
             key = f"key_{i:06d}"
-            content += f"    '{key}' => '{text}',\n"
+            yield f"    '{key}' => '{text}',\n"
             
             # إضافة نصوص عربية أحياناً
             if i % 10 == 0:
                 arabic_text = f"نص عربي {i}"
-                content += f"    'arabic_{i}' => '{arabic_text}',\n"
+                yield f"    'arabic_{i}' => '{arabic_text}',\n"
         
-        content += "];\n"
-        
-        # كتابة الملف
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(content)
-            
-        print(f"✅ تم إنشاء {output_path} ({len(content):,} حرف)")
-        return output_path
+        yield "];\n"
     
     def generate_random_text(self, min_words, max_words):
         """إنشاء نص عشوائي"""
@@ -255,6 +261,78 @@ class PerformanceTest:
         
         self.results['optimal_batch_size'] = results
         
+    def test_escape_round_trip(self):
+        """اختبار أن التحميل والتعديل والحفظ ثم إعادة التحميل يحفظ ' و " و \\ وفواصل الأسطر والجدولة"""
+        print(f"\n🔁 اختبار تهريب النصوص عند الحفظ وإعادة التحميل...")
+        
+        php_content = (
+            "<?php\n\nreturn [\n"
+            "    'quote_single' => 'Don\\'t save',\n"
+            "    \"quote_double\" => \"Say \\\"hello\\\"\",\n"
+            "    'path' => 'C:\\\\Users\\\\new',\n"
+            "    'mixed' => 'Name x',\n"
+            "    'welcome' => 'Hello\\nWorld',\n"
+            "    \"tabbed\" => \"Name:\\tValue\",\n"
+            "];\n"
+        )
+        new_values = {
+            'quote_single': "لا 'تحفظ'",
+            'quote_double': 'قل "مرحبا"',
+            'path': 'مسار الملفات في C:\\Users\\new',
+            'mixed': "اسم المستخدم 'x' \"y\" \\ $y \\n",
+            'welcome': "مرحبا\nبالعالم يا 'صديق' \"عزيز\"",
+            'tabbed': "الاسم:\tالقيمة 'هنا' \"هناك\"\nسطر ثانٍ",
+        }
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = Path(temp_dir) / "escape_test.php"
+            file_path.write_text(php_content, encoding='utf-8')
+            
+            handler = PHPFileHandler()
+            handler.load_file(file_path)
+            originals = {item['key']: item['original_value'] for item in handler.translations}
+            
+            for index, item in enumerate(handler.translations):
+                handler.update_translation(index, new_values[item['key']])
+            handler.save_file(create_backup=False)
+            first_save = file_path.read_text(encoding='utf-8')
+            # كل قيمة تبقى على سطرها: فواصل الأسطر تُكتب كتسلسلات هروب
+            single_line = first_save.count('\n') == php_content.count('\n')
+            
+            reloaded = PHPFileHandler()
+            reloaded.load_file(file_path)
+            values = {item['key']: item['original_value'] for item in reloaded.translations}
+            
+            # حفظ ثانٍ بلا تعديل حقيقي يجب ألا يغير الملف (لا تتضاعف الشرطات المائلة)
+            for index, item in enumerate(reloaded.translations):
+                reloaded.update_translation(index, item['original_value'])
+            reloaded.save_file(create_backup=False)
+            second_save = file_path.read_text(encoding='utf-8')
+        
+        result = {
+            'success': (values == new_values and first_save == second_save and single_line and
+                        originals['path'] == 'C:\\Users\\new' and originals['quote_single'] == "Don't save"),
+            'originals_decoded': originals == {
+                'quote_single': "Don't save",
+                'quote_double': 'Say "hello"',
+                'path': 'C:\\Users\\new',
+                'mixed': 'Name x',
+                'welcome': 'Hello\nWorld',
+                'tabbed': 'Name:\tValue',
+            },
+            'keys_match': set(values) == set(new_values),
+            'values_match': values == new_values,
+            'single_line_values': single_line,
+            'stable_on_resave': first_save == second_save,
+        }
+        
+        print(f"   ✅ نجح: {result['success']}")
+        if not result['values_match']:
+            print(f"   ❌ القيم بعد إعادة التحميل: {values}")
+        
+        self.results['escape_round_trip'] = result
+        return result
+        
     def run_full_test(self, num_items=7000):
         """تشغيل الاختبار الكامل"""
         print("🚀 بدء اختبار الأداء الشامل")
@@ -283,6 +361,9 @@ class PerformanceTest:
             # 6. اختبار حساب الحجم الأمثل
             self.test_optimal_batch_size()
             
+            # 7. اختبار تهريب النصوص عند الحفظ وإعادة التحميل
+            self.test_escape_round_trip()
+            
             # طباعة الملخص
             self.print_test_summary()
             
@@ -2,12 +2,31 @@
 """
 كلاسات الترجمة للنماذج المختلفة: GPT, Gemini
 """
+import re
 import time
-import requests
 import json
+import hashlib
+import threading
 from abc import ABC, abstractmethod
-from config import TRANSLATION_PROMPT
-from utils import clean_text_for_translation, format_translation_result, translation_cache
+from config import TRANSLATION_PROMPT, BATCH_TRANSLATION_PROMPT
+from utils import clean_text_for_translation, format_translation_result, translation_cache, rate_limiter
+
+# جلسة HTTP واحدة لكل المترجمات: تعيد استخدام اتصالات TCP/TLS بين الطلبات
+_http_session = None
+_http_session_lock = threading.Lock()
+
+def get_http_session():
+    """الجلسة المشتركة (تُنشأ عند أول طلب لتسريع بدء البرنامج)"""
+    global _http_session
+    if _http_session is None:
+        with _http_session_lock:
+            if _http_session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                session = requests.Session()
+                session.mount('https://', HTTPAdapter(pool_connections=8, pool_maxsize=32))
+                _http_session = session
+    return _http_session
 
 class BaseTranslator(ABC):
     """الكلاس الأساسي لجميع المترجمات"""
@@ -19,7 +38,7 @@ class BaseTranslator(ABC):
         self.rate_limit_delay = 1  # ثانية واحدة بين الطلبات
         
     @abstractmethod
-    def _make_request(self, text):
+    def _make_request(self, text, max_tokens=150, system_prompt=TRANSLATION_PROMPT):
         """تنفيذ طلب الترجمة (يجب تطبيقه في كل كلاس فرعي)"""
         pass
     
@@ -73,6 +92,89 @@ class BaseTranslator(ABC):
                     print(f"فشلت جميع المحاولات للنص '{clean_text}': {e}")
                     return text
                     
+    def translate_batch(self, texts, use_cache=True):
+        """ترجمة مجموعة نصوص في طلب واحد للـ API
+        
+        النصوص الموجودة في الذاكرة المؤقتة لا تُرسل، والباقي يُرسل كمصفوفة JSON
+        واحدة. عند فشل الطلب أو تعذر تحليل الاستجابة يُعاد للترجمة الفردية.
+        """
+        results = list(texts)
+        pending = []  # (الموضع، النص المنظف)
+        
+        for position, text in enumerate(texts):
+            clean_text = clean_text_for_translation(text)
+            if not clean_text:
+                continue
+            
+            if use_cache:
+                cached_result = translation_cache.get(clean_text)
+                if cached_result:
+                    results[position] = cached_result
+                    continue
+            
+            pending.append((position, clean_text))
+        
+        if not pending:
+            return results
+        
+        if len(pending) == 1:
+            position, _ = pending[0]
+            results[position] = self.translate(texts[position], use_cache)
+            return results
+        
+        # تطبيق Rate Limiting مرة واحدة للدفعة
+        self._apply_rate_limit()
+        
+        try:
+            response = self._make_request(
+                self._build_batch_prompt([clean_text for _, clean_text in pending]),
+                max_tokens=150 * len(pending),
+                system_prompt=BATCH_TRANSLATION_PROMPT
+            )
+            translations = self._parse_json_batch_response(response, len(pending))
+        except Exception as e:
+            print(f"فشل في الترجمة الدفعية: {e}")
+            translations = None
+        
+        if translations is None:
+            # العودة للترجمة الفردية
+            for position, _ in pending:
+                results[position] = self.translate(texts[position], use_cache)
+            return results
+        
+        for (position, clean_text), translated in zip(pending, translations):
+            formatted_result = format_translation_result(texts[position], translated)
+            if use_cache:
+                translation_cache.set(clean_text, formatted_result)
+            results[position] = formatted_result
+            
+        return results
+    
+    def _build_batch_prompt(self, texts):
+        """إنشاء طلب دفعي: النصوص كمصفوفة JSON مرقمة ضمنياً بترتيبها
+        
+        التعليمات كلها في BATCH_TRANSLATION_PROMPT الثابت، والجزء المتغير هو المصفوفة فقط
+        """
+        return json.dumps(texts, ensure_ascii=False)
+    
+    def _parse_json_batch_response(self, response, expected_count):
+        """استخراج مصفوفة الترجمات من الاستجابة، أو None إذا لم تكن صالحة"""
+        start = response.find('[')
+        end = response.rfind(']')
+        if start == -1 or end <= start:
+            return None
+            
+        try:
+            translations = json.loads(response[start:end + 1])
+        except ValueError:
+            return None
+            
+        if (not isinstance(translations, list) or len(translations) != expected_count
+                or not all(isinstance(item, str) and item.strip() for item in translations)):
+            return None
+            
+        return [item.strip() for item in translations]
+    
     def translate_batch_optimized(self, texts, max_batch_size=10):
         """ترجمة دفعية محسنة لتقليل التكاليف"""
         if not texts:
@@ -249,9 +351,10 @@ class GPTTranslator(BaseTranslator):
     def __init__(self, api_key, model_name='gpt-3.5-turbo'):
         super().__init__(api_key, model_name)
         self.base_url = "https://api.openai.com/v1/chat/completions"
+        self.api_root = "https://api.openai.com/v1"
         self.rate_limit_delay = 0.5  # GPT أسرع قليلاً
         
-    def _make_request(self, text):
+    def _make_request(self, text, max_tokens=150, system_prompt=TRANSLATION_PROMPT):
         """تنفيذ طلب الترجمة لـ GPT"""
         headers = {
             'Authorization': f'Bearer {self.api_key}',
@@ -263,24 +366,108 @@ class GPTTranslator(BaseTranslator):
             'messages': [
                 {
                     'role': 'system',
-                    'content': TRANSLATION_PROMPT
+                    'content': system_prompt
                 },
                 {
                     'role': 'user',
                     'content': text
                 }
             ],
-            'max_tokens': 150,
+            'max_tokens': max_tokens,
             'temperature': 0.3
         }
         
-        response = requests.post(self.base_url, headers=headers, json=data, timeout=30)
+        response = get_http_session().post(self.base_url, headers=headers, json=data, timeout=30)
+        rate_limiter.update(self.model_name, response.headers)
         
         if response.status_code == 200:
             result = response.json()
             return result['choices'][0]['message']['content'].strip()
         else:
             raise Exception(f"GPT API Error: {response.status_code} - {response.text}")
+            
+    # === Batch API: نصف التكلفة مقابل تنفيذ غير متزامن خلال 24 ساعة ===
+    
+    def _api_headers(self):
+        return {'Authorization': f'Bearer {self.api_key}'}
+        
+    def build_batch_request(self, custom_id, text):
+        """سطر طلب واحد في ملف JSONL الخاص بـ Batch API"""
+        return {
+            'custom_id': custom_id,
+            'method': 'POST',
+            'url': '/v1/chat/completions',
+            'body': {
+                'model': self.model_name,
+                'messages': [
+                    {'role': 'system', 'content': TRANSLATION_PROMPT},
+                    {'role': 'user', 'content': clean_text_for_translation(text)}
+                ],
+                'max_tokens': 150,
+                'temperature': 0.3
+            }
+        }
+        
+    def create_batch_job(self, requests_jsonl):
+        """رفع ملف الطلبات وإنشاء مهمة Batch API"""
+        response = get_http_session().post(
+            f"{self.api_root}/files", headers=self._api_headers(),
+            data={'purpose': 'batch'},
+            files={'file': ('batch.jsonl', requests_jsonl.encode('utf-8'), 'application/jsonl')},
+            timeout=120
+        )
+        if response.status_code != 200:
+            raise Exception(f"GPT Batch API Error: {response.status_code} - {response.text}")
+            
+        response = get_http_session().post(
+            f"{self.api_root}/batches", headers=self._api_headers(),
+            json={
+                'input_file_id': response.json()['id'],
+                'endpoint': '/v1/chat/completions',
+                'completion_window': '24h'
+            },
+            timeout=30
+        )
+        if response.status_code != 200:
+            raise Exception(f"GPT Batch API Error: {response.status_code} - {response.text}")
+        return response.json()
+        
+    def get_batch_job(self, batch_id):
+        """حالة مهمة Batch API"""
+        response = get_http_session().get(f"{self.api_root}/batches/{batch_id}", headers=self._api_headers(), timeout=30)
+        if response.status_code != 200:
+            raise Exception(f"GPT Batch API Error: {response.status_code} - {response.text}")
+        return response.json()
+        
+    def cancel_batch_job(self, batch_id):
+        """إلغاء مهمة Batch API"""
+        get_http_session().post(f"{self.api_root}/batches/{batch_id}/cancel", headers=self._api_headers(), timeout=30)
+        
+    def get_batch_results(self, file_id, texts):
+        """تنزيل نتائج المهمة: {custom_id: الترجمة} مع حفظها في الذاكرة المؤقتة
+        
+        texts: {custom_id: النص الأصلي}
+        """
+        response = get_http_session().get(f"{self.api_root}/files/{file_id}/content", headers=self._api_headers(), timeout=120)
+        if response.status_code != 200:
+            raise Exception(f"GPT Batch API Error: {response.status_code} - {response.text}")
+            
+        results = {}
+        for line in response.text.splitlines():
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            custom_id = entry.get('custom_id')
+            reply = entry.get('response') or {}
+            if custom_id not in texts or reply.get('status_code') != 200:
+                continue
+                
+            translated = reply['body']['choices'][0]['message']['content'].strip()
+            formatted_result = format_translation_result(texts[custom_id], translated)
+            translation_cache.set(clean_text_for_translation(texts[custom_id]), formatted_result)
+            results[custom_id] = formatted_result
+            
+        return results
 
 class GeminiTranslator(BaseTranslator):
     """مترجم Google Gemini - محدث للإصدارات الجديدة"""
@@ -298,7 +485,7 @@ class GeminiTranslator(BaseTranslator):
         self.base_url = f"https://generativelanguage.googleapis.com/v1beta/models/{self.api_model_name}:generateContent"
         self.rate_limit_delay = 0.3  # Gemini سريع
         
-    def _make_request(self, text):
+    def _make_request(self, text, max_tokens=150, system_prompt=TRANSLATION_PROMPT):
         """تنفيذ طلب الترجمة لـ Gemini"""
         url = f"{self.base_url}?key={self.api_key}"
         
@@ -311,14 +498,14 @@ class GeminiTranslator(BaseTranslator):
                 {
                     'parts': [
                         {
-                            'text': f"{TRANSLATION_PROMPT}\n\n{text}"
+                            'text': f"{system_prompt}\n\n{text}"
                         }
                     ]
                 }
             ],
             'generationConfig': {
                 'temperature': 0.3,
-                'maxOutputTokens': 150,
+                'maxOutputTokens': max_tokens,
                 'topP': 0.8,
                 'topK': 40
             },
@@ -342,7 +529,8 @@ class GeminiTranslator(BaseTranslator):
             ]
         }
         
-        response = requests.post(url, headers=headers, json=data, timeout=30)
+        response = get_http_session().post(url, headers=headers, json=data, timeout=30)
+        rate_limiter.update(self.model_name, response.headers)
         
         if response.status_code == 200:
             result = response.json()
@@ -371,10 +559,41 @@ class TranslatorManager:
     def __init__(self):
         self.translators = {}
         self.current_translator = None
+        # ترجمات الجلسة الحالية: (اسم المترجم، النص المطبّع) -> الترجمة، مشتركة بين كل عمليات الترجمة
+        self.already_translated = {}
+        # أسماء المترجمات المتاحة، يُعاد بناؤها عند الإضافة أو الحذف فقط
+        self._available_set = frozenset()
+        # المترجمات المنشأة حسب (المزود، بصمة المفتاح، النموذج) لإعادة استخدامها عند التحديث
+        self._translator_cache = {}
         
     def add_translator(self, name, translator):
         """إضافة مترجم جديد"""
+        if self.current_translator is not None and self.translators.get(name) is self.current_translator:
+            self.current_translator = translator  # استبدال مترجم النموذج الحالي (بمفتاح جديد مثلاً)
         self.translators[name] = translator
+        self._available_set = frozenset(self.translators)
+        
+    def remove_translator(self, name):
+        """حذف مترجم (عند حذف مفتاحه مثلاً)"""
+        translator = self.translators.pop(name, None)
+        if translator is not None and translator is self.current_translator:
+            self.current_translator = None
+        self._available_set = frozenset(self.translators)
+        
+    def ensure_translator(self, name, provider, api_key):
+        """إضافة مترجم للنموذج، مع إعادة استخدام الموجود إن لم يتغير المزود والمفتاح"""
+        fingerprint = hashlib.sha256(api_key.encode('utf-8')).digest()[:8]
+        cache_key = (provider, fingerprint, name)
+        translator = self._translator_cache.get(cache_key)
+        if translator is None:
+            translator = create_translator(provider, api_key, name)
+            self._translator_cache[cache_key] = translator
+        self.add_translator(name, translator)
+        
+    @property
+    def available_set(self):
+        """مجموعة أسماء المترجمات المتاحة (للفحص السريع بـ in)"""
+        return self._available_set
         
     def set_current_translator(self, name):
         """تعيين المترجم الحالي"""
@@ -406,23 +625,20 @@ class TranslatorManager:
             return [text]
             
     def translate_batch(self, texts, translator_name=None, progress_callback=None):
-        """ترجمة مجموعة من النصوص"""
-        results = []
-        total = len(texts)
+        """ترجمة مجموعة من النصوص في طلب واحد للـ API"""
+        if translator_name and translator_name in self.translators:
+            translator = self.translators[translator_name]
+        elif self.current_translator:
+            translator = self.current_translator
+        else:
+            raise Exception("لم يتم تعيين مترجم")
         
-        for i, text in enumerate(texts):
-            try:
-                translated = self.translate(text, translator_name)
-                results.append(translated)
-                
-                # تحديث شريط التقدم
-                if progress_callback:
-                    progress_callback(i + 1, total)
-                    
-            except Exception as e:
-                print(f"خطأ في ترجمة النص '{text}': {e}")
-                results.append(text)  # إرجاع النص الأصلي في حالة الخطأ
-                
+        results = translator.translate_batch(texts)
+        
+        # تحديث شريط التقدم
+        if progress_callback:
+            progress_callback(len(texts), len(texts))
+            
         return results
         
     def test_translator(self, translator_name):
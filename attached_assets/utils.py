@@ -6,17 +6,20 @@ import re
 import json
 import time
 import gc
-import psutil
+import hashlib
+import sqlite3
 import threading
+from functools import lru_cache
 from pathlib import Path
 from concurrent.futures import ThreadPoolExecutor
-from config import CACHE_FILE, DELIVERY_TERMINOLOGY, PROJECTS_DIR
+from config import CACHE_FILE, PERSISTENT_CACHE_FILE, DELIVERY_TERMINOLOGY, PROJECTS_DIR
 
 class TranslationCache:
     """ذاكرة تخزين مؤقت للترجمات"""
     
     def __init__(self):
         self.cache = {}
+        self.lock = threading.Lock()
         self.load_cache()
         
     def load_cache(self):
@@ -32,8 +35,9 @@ class TranslationCache:
     def save_cache(self):
         """حفظ الذاكرة المؤقتة"""
         try:
-            with open(CACHE_FILE, 'w', encoding='utf-8') as f:
-                json.dump(self.cache, f, ensure_ascii=False, indent=2)
+            # نسخة ثابتة لأن خيوط الترجمة قد تضيف للذاكرة أثناء الحفظ
+            with self.lock, open(CACHE_FILE, 'w', encoding='utf-8') as f:
+                json.dump(dict(self.cache), f, ensure_ascii=False, indent=2)
         except Exception as e:
             print(f"خطأ في حفظ الذاكرة المؤقتة: {e}")
             
@@ -50,6 +54,103 @@ class TranslationCache:
         if len(self.cache) % 10 == 0:
             self.save_cache()
 
+class PersistentTranslationCache:
+    """ذاكرة ترجمات دائمة على القرص (SQLite) مفتاحها النموذج واللغة الهدف والنص
+    
+    الكتابات تُجمع في الذاكرة وتُكتب دفعة واحدة عند امتلاء الدفعة أو عند استدعاء flush.
+    """
+    
+    TTL_SECONDS = 14 * 24 * 60 * 60  # 14 يوماً
+    FLUSH_SIZE = 100
+    
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.pending = {}
+        self.lock = threading.Lock()
+        
+        try:
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+            self.conn = sqlite3.connect(str(db_path), check_same_thread=False)
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS translations "
+                "(key TEXT PRIMARY KEY, translation TEXT, created_at INTEGER)"
+            )
+            self.conn.commit()
+        except Exception as e:
+            print(f"خطأ في فتح الذاكرة الدائمة: {e}")
+            self.conn = None
+            
+    @staticmethod
+    def make_key(text, model, target_lang='ar'):
+        """مفتاح التخزين: sha256 للنموذج واللغة الهدف والنص المنظف"""
+        raw = f"{model}:{target_lang}:{clean_text_for_cache(text)}"
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+        
+    def get(self, text, model, target_lang='ar'):
+        """البحث عن ترجمة لم تنته صلاحيتها"""
+        if self.conn is None:
+            return None
+            
+        key = self.make_key(text, model, target_lang)
+        with self.lock:
+            row = self.pending.get(key)
+            if row is None:
+                try:
+                    row = self.conn.execute(
+                        "SELECT translation, created_at FROM translations WHERE key = ?", (key,)
+                    ).fetchone()
+                except Exception as e:
+                    print(f"خطأ في قراءة الذاكرة الدائمة: {e}")
+                    return None
+                    
+        if row is None or time.time() - row[1] > self.TTL_SECONDS:
+            return None
+        return row[0]
+        
+    def set(self, text, translation, model, target_lang='ar'):
+        """إضافة ترجمة (تُكتب على القرص مع الدفعة التالية)"""
+        if self.conn is None:
+            return
+            
+        key = self.make_key(text, model, target_lang)
+        with self.lock:
+            self.pending[key] = (translation, int(time.time()))
+            should_flush = len(self.pending) >= self.FLUSH_SIZE
+            
+        if should_flush:
+            self.flush()
+            
+    def flush(self):
+        """كتابة الترجمات المعلقة على القرص دفعة واحدة"""
+        with self.lock:
+            if self.conn is None or not self.pending:
+                return
+                
+            rows = [(key, translation, created_at)
+                    for key, (translation, created_at) in self.pending.items()]
+            self.pending = {}
+            
+            try:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO translations (key, translation, created_at) VALUES (?, ?, ?)",
+                    rows
+                )
+                self.conn.commit()
+            except Exception as e:
+                print(f"خطأ في حفظ الذاكرة الدائمة: {e}")
+                
+    def clear(self):
+        """مسح جميع الترجمات المحفوظة"""
+        with self.lock:
+            self.pending = {}
+            if self.conn is None:
+                return
+            try:
+                self.conn.execute("DELETE FROM translations")
+                self.conn.commit()
+            except Exception as e:
+                print(f"خطأ في مسح الذاكرة الدائمة: {e}")
+
 def clean_text_for_translation(text):
     """تنظيف النص للترجمة - فهم النص رغم الشرطات والرموز"""
     if not text or not isinstance(text, str):
@@ -82,25 +183,34 @@ def clean_text_for_cache(text):
         return ""
     return text.lower().strip()
 
+# أنماط فحص المحتوى العربي (مُجمّعة مرة واحدة)
+_NON_WORD_RE = re.compile(r'[^\w\s]')
+_DIGITS_RE = re.compile(r'\d+')
+_ARABIC_CHAR_RE = re.compile(r'[\u0600-\u06FF\u0750-\u077F\u08A0-\u08FF]')
+_LETTER_CHAR_RE = re.compile(r'[a-zA-Z\u0600-\u06FF\u0750-\u077F\u08A0-\u08FF]')
+
 def is_arabic_text(text):
     """التحقق من وجود نص عربي"""
     if not text:
         return False
-    arabic_pattern = re.compile(r'[\u0600-\u06FF\u0750-\u077F\u08A0-\u08FF]+')
-    return bool(arabic_pattern.search(text))
+    return _ARABIC_CHAR_RE.search(text) is not None
 
 def has_arabic_content(text):
     """التحقق من وجود محتوى عربي كافي لاعتبار النص مترجماً"""
     if not text:
         return False
     
+    # خروج سريع: لا يوجد أي حرف عربي
+    if not _ARABIC_CHAR_RE.search(text):
+        return False
+    
     # إزالة الرموز والأرقام
-    clean_text = re.sub(r'[^\w\s]', '', text)
-    clean_text = re.sub(r'\d+', '', clean_text)
+    clean_text = _NON_WORD_RE.sub('', text)
+    clean_text = _DIGITS_RE.sub('', clean_text)
     
     # حساب عدد الأحرف العربية
-    arabic_chars = len(re.findall(r'[\u0600-\u06FF\u0750-\u077F\u08A0-\u08FF]', clean_text))
-    total_chars = len(re.findall(r'[a-zA-Z\u0600-\u06FF\u0750-\u077F\u08A0-\u08FF]', clean_text))
+    arabic_chars = len(_ARABIC_CHAR_RE.findall(clean_text))
+    total_chars = len(_LETTER_CHAR_RE.findall(clean_text))
     
     if total_chars == 0:
         return False
@@ -143,13 +253,15 @@ def should_skip_translation(text):
         
     return False
 
+@lru_cache(maxsize=65536)
 def determine_translation_status(original_text, translated_text):
-    """تحديد حالة الترجمة بناءً على المحتوى"""
-    if not translated_text or translated_text.strip() == "":
+    """تحديد حالة الترجمة بناءً على المحتوى (محفوظة لكل زوج نصوص، فالنصوص المتكررة لا يُعاد فحصها)"""
+    stripped_translation = translated_text.strip() if translated_text else ""
+    if not stripped_translation:
         return "غير مترجم"
         
     # إذا كان النص الأصلي والترجمة متطابقين
-    if original_text.strip() == translated_text.strip():
+    if original_text.strip() == stripped_translation:
         if has_arabic_content(original_text):
             return "لا يحتاج ترجمة"
         else:
@@ -226,11 +338,14 @@ def create_backup_filename(original_path):
     timestamp = time.strftime("%Y%m%d_%H%M%S")
     return path.parent / f"{path.stem}_backup_{timestamp}{path.suffix}"
 
+_WORD_COUNT_RE = re.compile(r'\b\w+\b')
+
+@lru_cache(maxsize=65536)
 def count_words(text):
-    """عد الكلمات في النص"""
+    """عد الكلمات في النص (النتيجة محفوظة لكل نص، فتكرار العد بين مراحل الترجمة مجاني)"""
     if not text:
         return 0
-    return len(re.findall(r'\b\w+\b', text))
+    return len(_WORD_COUNT_RE.findall(text))
 
 def sanitize_filename(filename):
     """تنظيف اسم الملف من الرموز غير المسموحة"""
@@ -238,6 +353,24 @@ def sanitize_filename(filename):
     filename = re.sub(r'[<>:"/\\|?*]', '_', filename)
     return filename
 
+def _dump_project_json(project_data):
+    """ترميز بيانات المشروع إلى JSON (orjson إن كانت مثبتة لأنها أسرع بكثير)"""
+    try:
+        import orjson
+        return orjson.dumps(project_data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    except ImportError:
+        return json.dumps(project_data, ensure_ascii=False, indent=2).encode('utf-8')
+
+def _read_project_json(project_file):
+    """قراءة ملف مشروع JSON دفعة واحدة وفك ترميزه"""
+    with open(project_file, 'rb') as f:
+        content = f.read()
+    try:
+        import orjson
+        return orjson.loads(content)
+    except ImportError:
+        return json.loads(content.decode('utf-8'))
+
 def save_project(file_handler, project_name=None):
     """حفظ المشروع الحالي"""
     if not project_name:
@@ -254,8 +387,8 @@ def save_project(file_handler, project_name=None):
     project_file = PROJECTS_DIR / f"{sanitize_filename(project_name)}.json"
     
     try:
-        with open(project_file, 'w', encoding='utf-8') as f:
-            json.dump(project_data, f, ensure_ascii=False, indent=2)
+        with open(project_file, 'wb') as f:
+            f.write(_dump_project_json(project_data))
         return str(project_file)
     except Exception as e:
         raise Exception(f"خطأ في حفظ المشروع: {str(e)}")
@@ -263,9 +396,7 @@ def save_project(file_handler, project_name=None):
 def load_project(project_file):
     """تحميل مشروع محفوظ"""
     try:
-        with open(project_file, 'r', encoding='utf-8') as f:
-            project_data = json.load(f)
-        return project_data
+        return _read_project_json(project_file)
     except Exception as e:
         raise Exception(f"خطأ في تحميل المشروع: {str(e)}")
 
@@ -274,13 +405,12 @@ def get_saved_projects():
     projects = []
     for project_file in PROJECTS_DIR.glob("*.json"):
         try:
-            with open(project_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                projects.append({
-                    'name': data.get('name', project_file.stem),
-                    'file': str(project_file),
-                    'created_at': data.get('created_at', 0)
-                })
+            data = _read_project_json(project_file)
+            projects.append({
+                'name': data.get('name', project_file.stem),
+                'file': str(project_file),
+                'created_at': data.get('created_at', 0)
+            })
         except:
             continue
     
@@ -288,26 +418,31 @@ def get_saved_projects():
     projects.sort(key=lambda x: x['created_at'], reverse=True)
     return projects
 
-def check_internet_connection():
-    """فحص الاتصال بالإنترنت"""
-    try:
-        import urllib.request
-        urllib.request.urlopen('http://www.google.com', timeout=5)
-        return True
-    except:
-        return False
+# آخر نتيجة لفحص الاتصال ووقتها، تُقرأ من خيوط الترجمة بدلاً من فحص جديد لكل نص
+_connection_state = {'online': True, 'checked_at': 0.0}
 
 def check_internet_connection():
-    """فحص الاتصال بالإنترنت"""
+    """فحص الاتصال بالإنترنت (وتحديث الحالة المحفوظة)"""
     try:
         import urllib.request
         urllib.request.urlopen('http://www.google.com', timeout=5)
-        return True
+        online = True
     except:
-        return False
+        online = False
+        
+    _connection_state['online'] = online
+    _connection_state['checked_at'] = time.monotonic()
+    return online
+
+def is_online(max_age=5):
+    """حالة الاتصال من آخر فحص، ولا يُعاد الفحص إلا إذا مضى عليه أكثر من max_age ثانية"""
+    if time.monotonic() - _connection_state['checked_at'] > max_age:
+        return check_internet_connection()
+    return _connection_state['online']
 
 def monitor_memory_usage():
     """مراقبة استخدام الذاكرة"""
+    import psutil  # استيراد عند الحاجة لتسريع بدء البرنامج
     process = psutil.Process()
     memory_info = process.memory_info()
     memory_mb = memory_info.rss / 1024 / 1024
@@ -442,6 +577,17 @@ def smart_text_grouping(texts, similarity_threshold=0.7):
     
     return groups
 
+def group_identical_texts(items):
+    """تجميع مواضع النصوص المتطابقة (بعد إزالة المسافات الطرفية) لترجمة كل نص مرة واحدة
+    
+    items: [(index, text), ...]
+    يُرجع قاموساً: النص المطبّع -> [(index, text), ...] بترتيب الظهور
+    """
+    groups = {}
+    for index, text in items:
+        groups.setdefault(text.strip(), []).append((index, text))
+    return groups
+
 def calculate_optimal_batch_size(total_items, available_memory_mb=None):
     """حساب الحجم الأمثل للدفعة بناءً على الذاكرة"""
     if not available_memory_mb:
@@ -489,5 +635,83 @@ def adaptive_delay_calculator(api_provider, error_count=0):
     
     return min(base_delay * error_multiplier, 10.0)  # حد أقصى 10 ثوان
 
+# مدة مثل "1s" أو "6m0s" أو "20ms" في رؤوس x-ratelimit-reset-*
+_RESET_DURATION_RE = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)')
+_RESET_UNITS = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+
+def parse_reset_duration(value):
+    """تحويل مدة إعادة التعيين إلى ثوان"""
+    if not value:
+        return 0.0
+    try:
+        return float(value)
+    except ValueError:
+        return sum(float(amount) * _RESET_UNITS[unit] for amount, unit in _RESET_DURATION_RE.findall(value))
+
+class RateLimiter:
+    """تنظيم إرسال الطلبات لكل نموذج حسب الحصة المتبقية في رؤوس استجابات API
+    
+    بدلاً من تأخير ثابت لكل نموذج: لا انتظار ما دامت الحصة متاحة، والانتظار حتى
+    موعد إعادة التعيين فقط عند نفاد الطلبات أو التوكنات.
+    """
+    
+    def __init__(self):
+        self.state = {}  # model -> {'rpm_remaining', 'tpm_remaining', 'reset_at'}
+        self.lock = threading.Lock()
+        
+    def update(self, model, headers):
+        """تحديث الحصة من رؤوس الاستجابة (OpenAI ترسل x-ratelimit-*، و429 قد ترسل Retry-After)"""
+        now = time.monotonic()
+        rpm = headers.get('x-ratelimit-remaining-requests')
+        tpm = headers.get('x-ratelimit-remaining-tokens')
+        retry_after = headers.get('retry-after')
+        
+        if rpm is None and tpm is None and retry_after is None:
+            return
+            
+        with self.lock:
+            state = self.state.setdefault(model, {'rpm_remaining': None, 'tpm_remaining': None, 'reset_at': 0.0})
+            if rpm is not None:
+                state['rpm_remaining'] = int(rpm)
+            if tpm is not None:
+                state['tpm_remaining'] = int(tpm)
+                
+            reset = max(parse_reset_duration(headers.get('x-ratelimit-reset-requests')),
+                        parse_reset_duration(headers.get('x-ratelimit-reset-tokens')))
+            if retry_after is not None:
+                reset = max(reset, parse_reset_duration(retry_after))
+                state['rpm_remaining'] = 0
+            state['reset_at'] = now + reset
+            
+    def wait_for(self, model, estimated_tokens=0):
+        """الانتظار فقط إذا لم تكف الحصة المتبقية للطلب التالي"""
+        with self.lock:
+            state = self.state.get(model)
+            if state is None:
+                return
+                
+            now = time.monotonic()
+            if now >= state['reset_at']:
+                # انتهت نافذة الحصة؛ القيم الجديدة تصل مع الاستجابة التالية
+                state['rpm_remaining'] = None
+                state['tpm_remaining'] = None
+                wait = 0.0
+            elif ((state['rpm_remaining'] is not None and state['rpm_remaining'] <= 0) or
+                  (state['tpm_remaining'] is not None and state['tpm_remaining'] < estimated_tokens)):
+                wait = state['reset_at'] - now
+            else:
+                wait = 0.0
+                
+            # حجز الحصة لهذا الطلب حتى لا تتجاوزها الخيوط المتوازية
+            if state['rpm_remaining'] is not None:
+                state['rpm_remaining'] -= 1
+            if state['tpm_remaining'] is not None:
+                state['tpm_remaining'] -= int(estimated_tokens)
+                
+        if wait > 0:
+            time.sleep(wait)
+
 # إنشاء مثيل عالي للذاكرة المؤقتة
-translation_cache = TranslationCache()
\ No newline at end of file
+translation_cache = TranslationCache()
+persistent_translation_cache = PersistentTranslationCache(PERSISTENT_CACHE_FILE)
+rate_limiter = RateLimiter()
\ No newline at end of file